@@ -8,6 +8,7 @@ from db.database import Base
 
 from models.users import User
 from models.tasks import Task
+from models.tokens import TokenRevocation
 
 config = context.config
 
@@ -22,7 +23,11 @@ def do_run_migrations(connection):
     Helper function to be called by the async runner.
     Configures the context and runs the migrations.
     """
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # For the whole session, so it also covers statements in autocommit blocks
+    connection.exec_driver_sql(f"SET lock_timeout = '{settings.MIGRATION_LOCK_TIMEOUT}'")
+    connection.commit()
+    # One transaction per migration, so no migration's locks are held while the next one runs
+    context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
     with context.begin_transaction():
         context.run_migrations()
 
@@ -51,6 +56,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
     with context.begin_transaction():
         context.run_migrations()
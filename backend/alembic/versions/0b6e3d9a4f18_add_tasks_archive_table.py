@@ -0,0 +1,68 @@
+"""Add tasks_archive table for old completed tasks
+
+Revision ID: 0b6e3d9a4f18
+Revises: f4b1d8c3a527
+Create Date: 2026-10-19 21:08:52.316470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e3d9a4f18'
+down_revision: Union[str, Sequence[str], None] = 'f4b1d8c3a527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tasks_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('due_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('priority', postgresql.ENUM(name='task_priority', create_type=False), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('notification_id', sa.String(), nullable=True),
+        sa.Column('recurrence_parent_id', sa.Integer(), nullable=True),
+        sa.Column('occurrence_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['recurrence_parent_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tasks_archive_user_due_date', 'tasks_archive', ['user_id', 'due_date'], unique=False)
+    op.create_index(
+        'ix_tasks_archive_recurrence_parent_occurrence',
+        'tasks_archive',
+        ['recurrence_parent_id', 'occurrence_date'],
+        unique=False,
+        postgresql_where=sa.text('recurrence_parent_id IS NOT NULL'),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_completed_at_archivable',
+            'tasks',
+            ['completed_at'],
+            unique=False,
+            postgresql_where=sa.text('completed = true AND recurrence_rule IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_completed_at_archivable', table_name='tasks', postgresql_concurrently=True)
+    op.drop_index('ix_tasks_archive_recurrence_parent_occurrence', table_name='tasks_archive')
+    op.drop_index('ix_tasks_archive_user_due_date', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
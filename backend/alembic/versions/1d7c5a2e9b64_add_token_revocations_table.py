@@ -0,0 +1,40 @@
+"""Add token_revocations table for refresh token families
+
+Revision ID: 1d7c5a2e9b64
+Revises: 0b6e3d9a4f18
+Create Date: 2026-10-19 21:47:13.582901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d7c5a2e9b64'
+down_revision: Union[str, Sequence[str], None] = '0b6e3d9a4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'token_revocations',
+        sa.Column('family_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('family_id'),
+    )
+    op.create_index('ix_token_revocations_revoked_at', 'token_revocations', ['revoked_at'], unique=False)
+    op.create_index('ix_token_revocations_expires_at', 'token_revocations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_revocations_expires_at', table_name='token_revocations')
+    op.drop_index('ix_token_revocations_revoked_at', table_name='token_revocations')
+    op.drop_table('token_revocations')
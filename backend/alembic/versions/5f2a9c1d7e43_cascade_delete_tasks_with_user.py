@@ -0,0 +1,37 @@
+"""Cascade delete tasks with their user
+
+Revision ID: 5f2a9c1d7e43
+Revises: 0e85c2b42317
+Create Date: 2026-10-19 18:05:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.online_migrations import validate_constraint
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c1d7e43'
+down_revision: Union[str, Sequence[str], None] = '0e85c2b42317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOT VALID skips checking every task while tasks is locked, the check runs afterwards
+    op.drop_constraint('tasks_user_id_fkey', 'tasks', type_='foreignkey')
+    op.create_foreign_key(
+        'tasks_user_id_fkey', 'tasks', 'users', ['user_id'], ['id'], ondelete='CASCADE', postgresql_not_valid=True
+    )
+    validate_constraint('tasks', 'tasks_user_id_fkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('tasks_user_id_fkey', 'tasks', type_='foreignkey')
+    op.create_foreign_key('tasks_user_id_fkey', 'tasks', 'users', ['user_id'], ['id'], postgresql_not_valid=True)
+    validate_constraint('tasks', 'tasks_user_id_fkey')
@@ -0,0 +1,40 @@
+"""Add trigram index on user email
+
+Revision ID: a3c8e5f0b912
+Revises: 5f2a9c1d7e43
+Create Date: 2026-10-19 18:31:40.207816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c8e5f0b912'
+down_revision: Union[str, Sequence[str], None] = '5f2a9c1d7e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY can't run inside a transaction, but doesn't block writes to users
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_email_trgm',
+            'users',
+            ['email'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'email': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_trgm', table_name='users', postgresql_concurrently=True)
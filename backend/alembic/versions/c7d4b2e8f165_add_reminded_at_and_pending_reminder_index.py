@@ -0,0 +1,39 @@
+"""Add reminded_at and pending reminder index to tasks
+
+Revision ID: c7d4b2e8f165
+Revises: a3c8e5f0b912
+Create Date: 2026-10-19 19:02:27.531090
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4b2e8f165'
+down_revision: Union[str, Sequence[str], None] = 'a3c8e5f0b912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('reminded_at', sa.DateTime(timezone=True), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_due_date_pending_reminder',
+            'tasks',
+            ['due_date'],
+            unique=False,
+            postgresql_where=sa.text('completed = false AND reminded_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_due_date_pending_reminder', table_name='tasks', postgresql_concurrently=True)
+    op.drop_column('tasks', 'reminded_at')
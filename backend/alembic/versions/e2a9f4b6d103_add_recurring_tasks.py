@@ -0,0 +1,59 @@
+"""Add recurrence columns and indexes to tasks
+
+Revision ID: e2a9f4b6d103
+Revises: c7d4b2e8f165
+Create Date: 2026-10-19 20:14:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.online_migrations import create_index_concurrently, drop_index_concurrently, validate_constraint
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9f4b6d103'
+down_revision: Union[str, Sequence[str], None] = 'c7d4b2e8f165'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('recurrence_rule', sa.String(), nullable=True))
+    op.add_column('tasks', sa.Column('recurrence_end', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('tasks', sa.Column('next_occurrence', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('tasks', sa.Column('recurrence_parent_id', sa.Integer(), nullable=True))
+    op.add_column('tasks', sa.Column('occurrence_date', sa.DateTime(timezone=True), nullable=True))
+    # NOT VALID skips checking every task while tasks is locked, the check runs afterwards
+    op.create_foreign_key(
+        'tasks_recurrence_parent_id_fkey', 'tasks', 'tasks', ['recurrence_parent_id'], ['id'], ondelete='CASCADE',
+        postgresql_not_valid=True,
+    )
+    validate_constraint('tasks', 'tasks_recurrence_parent_id_fkey')
+    create_index_concurrently(
+        'ix_tasks_user_next_occurrence_recurring',
+        'tasks',
+        ['user_id', 'next_occurrence'],
+        postgresql_where=sa.text('recurrence_rule IS NOT NULL'),
+    )
+    create_index_concurrently(
+        'uq_tasks_recurrence_parent_occurrence',
+        'tasks',
+        ['recurrence_parent_id', 'occurrence_date'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('uq_tasks_recurrence_parent_occurrence', 'tasks')
+    drop_index_concurrently('ix_tasks_user_next_occurrence_recurring', 'tasks')
+    op.drop_constraint('tasks_recurrence_parent_id_fkey', 'tasks', type_='foreignkey')
+    op.drop_column('tasks', 'occurrence_date')
+    op.drop_column('tasks', 'recurrence_parent_id')
+    op.drop_column('tasks', 'next_occurrence')
+    op.drop_column('tasks', 'recurrence_end')
+    op.drop_column('tasks', 'recurrence_rule')
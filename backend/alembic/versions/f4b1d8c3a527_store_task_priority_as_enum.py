@@ -0,0 +1,77 @@
+"""Store task priority as an enum and index it with user and due date
+
+Revision ID: f4b1d8c3a527
+Revises: e2a9f4b6d103
+Create Date: 2026-10-19 20:41:37.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from db.online_migrations import (
+    backfill_in_batches, create_index_concurrently, drop_index_concurrently, set_not_null, with_lock_retries,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b1d8c3a527'
+down_revision: Union[str, Sequence[str], None] = 'e2a9f4b6d103'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+task_priority = postgresql.ENUM('low', 'medium', 'high', name='task_priority')
+
+# Values outside the known levels (the column used to be free-form) become medium
+PRIORITY_AS_ENUM = (
+    "(CASE WHEN lower(trim({column})) IN ('low', 'medium', 'high') "
+    "THEN lower(trim({column})) ELSE 'medium' END)::task_priority"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # An in-place type change would rewrite tasks under an ACCESS EXCLUSIVE
+    # lock. Instead the enum goes into a new column, kept in sync by a
+    # trigger while existing rows are backfilled in batches, then swapped in.
+    task_priority.create(op.get_bind(), checkfirst=True)
+    op.execute(
+        "CREATE OR REPLACE FUNCTION tasks_sync_priority_enum() RETURNS trigger AS $$ "
+        f"BEGIN NEW.priority_enum := {PRIORITY_AS_ENUM.format(column='NEW.priority')}; RETURN NEW; END "
+        "$$ LANGUAGE plpgsql"
+    )
+    with_lock_retries([
+        "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS priority_enum task_priority",
+        "DROP TRIGGER IF EXISTS tasks_sync_priority_enum ON tasks",
+        "CREATE TRIGGER tasks_sync_priority_enum BEFORE INSERT OR UPDATE ON tasks "
+        "FOR EACH ROW EXECUTE FUNCTION tasks_sync_priority_enum()",
+    ])
+    backfill_in_batches(
+        'tasks',
+        f"priority_enum = {PRIORITY_AS_ENUM.format(column='tasks.priority')}",
+        "priority_enum IS NULL",
+    )
+    set_not_null('tasks', 'priority_enum')
+    with_lock_retries([
+        "DROP TRIGGER tasks_sync_priority_enum ON tasks",
+        "ALTER TABLE tasks DROP COLUMN priority",
+        "ALTER TABLE tasks RENAME COLUMN priority_enum TO priority",
+    ])
+    op.execute("DROP FUNCTION tasks_sync_priority_enum()")
+    create_index_concurrently('ix_tasks_user_priority_due_date', 'tasks', ['user_id', 'priority', 'due_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_tasks_user_priority_due_date', 'tasks')
+    op.alter_column(
+        'tasks',
+        'priority',
+        existing_type=task_priority,
+        type_=sa.String(),
+        existing_nullable=False,
+        postgresql_using='priority::text',
+    )
+    task_priority.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,4 @@
+# Accounts created by benchmarks.seed and used by benchmarks.load_test
+BENCH_EMAIL_TEMPLATE = "bench-user-{}@example.com"
+BENCH_PASSWORD = "bench-password"
+PRIORITIES = ["low", "medium", "high"]
@@ -0,0 +1,78 @@
+"""
+Checks that deleting a user with many tasks is a single DELETE handled by the
+ON DELETE CASCADE foreign key, with memory independent of the task count.
+Needs a local, migrated database.
+
+Usage: python -m benchmarks.cascade_delete [--tasks 50000]
+"""
+import argparse
+import asyncio
+import datetime
+import time
+import tracemalloc
+
+from sqlalchemy import event, insert, select, func
+
+from core.config import settings
+from db.database import SessionLocal, engine
+from models.tasks import Task
+from models.users import User
+
+
+async def run(task_count: int) -> None:
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError("Refusing to run against a production database.")
+
+    due_date = datetime.datetime.now(datetime.UTC)
+    async with SessionLocal() as db:
+        user = User(email=f"cascade-{time.time_ns()}@example.com", auth_provider="local")
+        db.add(user)
+        await db.flush()
+        await db.execute(insert(Task), [
+            {"user_id": user.id, "title": f"Task {i}", "due_date": due_date, "priority": "low"}
+            for i in range(task_count)
+        ])
+        await db.commit()
+        user_id = user.id
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    # Same path as the sqladmin delete: load the user, delete it through the ORM
+    async with SessionLocal() as db:
+        user = await db.get(User, user_id)
+        await db.delete(user)
+        await db.commit()
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    async with SessionLocal() as db:
+        remaining = await db.scalar(select(func.count(Task.id)).where(Task.user_id == user_id))
+    await engine.dispose()
+
+    deletes = statements.count("DELETE")
+    print(f"Deleted user with {task_count} tasks in {elapsed * 1000:.0f} ms")
+    print(f"Statements: {len(statements)} ({deletes} DELETE), peak Python memory: {peak / 1024:.0f} KiB")
+    print(f"Tasks left behind: {remaining}")
+    if deletes != 1 or remaining:
+        raise SystemExit("Expected a single DELETE cascading to all tasks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+CPU cost against bytes saved of response compression, for TaskResponse lists
+as the task list endpoint returns them. Runs offline, every encoding whose
+package is installed is measured at a few levels, next to the cost of
+serializing the list itself.
+
+Usage: python -m benchmarks.compression [--sizes 10,100,1000] [--repeat 5]
+"""
+import argparse
+import datetime
+from types import SimpleNamespace
+
+from pydantic import TypeAdapter
+
+from benchmarks.micro import measure  # also sets placeholder settings
+from core.compression import COMPRESSORS, DEFAULT_LEVELS, compressor_factory
+from schemas.tasks import TaskResponse
+
+LEVELS = {"gzip": [1, 4, 6, 9], "br": [1, 4, 6], "zstd": [1, 3, 9]}
+PRIORITIES = ["low", "medium", "high"]
+
+
+def task_rows(count: int) -> list[SimpleNamespace]:
+    """Rows with the variety of real lists: mixed lengths, optional fields set on some."""
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        SimpleNamespace(
+            id=1000 + i, user_id=7, title=f"Task {i}: follow up on item #{i * 37 % 1000}",
+            description=None if i % 3 == 0 else f"Notes for task {i}. " * (1 + i % 5),
+            completed=i % 4 == 0, due_date=now + datetime.timedelta(hours=i * 7),
+            priority=PRIORITIES[i % 3], recurrence_rule="FREQ=WEEKLY;BYDAY=MO" if i % 10 == 0 else None,
+            created_at=now - datetime.timedelta(days=i), completed_at=now if i % 4 == 0 else None,
+            notification_id=f"notification-{i}" if i % 2 else None,
+            next_occurrence=None, recurrence_parent_id=None, occurrence_date=None,
+        )
+        for i in range(count)
+    ]
+
+
+def compress(encoding: str, level: int, body: bytes) -> bytes:
+    compressor = compressor_factory(encoding, level)()
+    return compressor.compress(body) + compressor.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="comma separated list lengths")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(list[TaskResponse])
+    encodings = [encoding for encoding in COMPRESSORS if compressor_factory(encoding) is not None]
+    missing = sorted(COMPRESSORS.keys() - set(encodings))
+    if missing:
+        print(f"Not measured, package not installed: {', '.join(missing)}")
+
+    print(f"{'tasks':>6}{'encoding':>10}{'level':>7}{'bytes':>10}{'ratio':>8}{'us':>10}{'MB/s':>9}{'KB saved/ms':>13}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        tasks = adapter.validate_python(task_rows(size), from_attributes=True)
+        body = adapter.dump_json(tasks)
+        serialize_us = measure(lambda: adapter.dump_json(tasks), args.repeat)
+        print(f"{size:>6}{'identity':>10}{'-':>7}{len(body):>10}{1:>8.2f}{serialize_us:>10.1f}{'-':>9}{'-':>13}"
+              "  (serialization)")
+
+        for encoding in encodings:
+            for level in LEVELS[encoding]:
+                compressed = compress(encoding, level, body)
+                elapsed_us = measure(lambda: compress(encoding, level, body), args.repeat)
+                saved_kb = (len(body) - len(compressed)) / 1024
+                default = "*" if level == DEFAULT_LEVELS[encoding] else ""
+                print(f"{size:>6}{encoding:>10}{f'{default}{level}':>7}{len(compressed):>10}"
+                      f"{len(body) / len(compressed):>8.2f}{elapsed_us:>10.1f}{len(body) / elapsed_us:>9.1f}"
+                      f"{saved_kb / (elapsed_us / 1000):>13.1f}")
+    print("* default level")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Asyncio/httpx load driver for the API.
+
+Simulated users log in as the accounts created by benchmarks.seed and then run a
+weighted mix of requests until the duration is over. Per endpoint it reports
+request count, errors, RPS and p50/p95/p99/mean latency in milliseconds as JSON,
+so results of two commits can be diffed or compared with --baseline.
+
+All simulated users log in from one IP, more than LOGIN_IP_RATE_LIMIT allows,
+so run the backend under test with RATE_LIMIT_ENABLED=false.
+
+Usage:
+    python -m benchmarks.seed
+    python -m benchmarks.load_test --base-url http://localhost:8000 --users 50 --duration 60 \\
+        --output benchmarks/results/$(git rev-parse --short HEAD).json [--baseline benchmarks/results/<old>.json]
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import BENCH_EMAIL_TEMPLATE, BENCH_PASSWORD, PRIORITIES
+
+# Relative weights of the operations a simulated user performs
+SCENARIO_WEIGHTS = {
+    "list_tasks": 35,
+    "list_tasks_range": 15,
+    "get_task": 15,
+    "create_task": 10,
+    "update_task": 10,
+    "delete_task": 5,
+    "refresh_token": 5,
+    "profile_details": 4,
+    "upload_picture": 1,
+}
+
+# Small valid PNG wrapped as the app sends it, padded to a typical avatar size
+PICTURE = "data:image/png;base64," + base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"\x00" * 48_000).decode()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class VirtualUser:
+    def __init__(self, index: int, api: str, recorder: Recorder, rng: random.Random):
+        self.email = BENCH_EMAIL_TEMPLATE.format(index)
+        self.api = api
+        self.recorder = recorder
+        self.rng = rng
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.task_ids: List[int] = []
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    async def login(self, client: httpx.AsyncClient) -> bool:
+        response = await self.recorder.call(
+            "login", client, "POST", f"{self.api}/users/login",
+            data={"username": self.email, "password": BENCH_PASSWORD},
+        )
+        if response is None:
+            return False
+        tokens = response.json()["tokens"]
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens["refresh_token"]
+        return True
+
+    async def run(self, client: httpx.AsyncClient, deadline: float) -> None:
+        if not await self.login(client):
+            return
+        names = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        while time.monotonic() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])(client)
+
+    async def list_tasks(self, client):
+        response = await self.recorder.call("list_tasks", client, "GET", f"{self.api}/tasks/get/all-tasks",
+                                            headers=self.auth)
+        if response is not None:
+            self.task_ids = [task["id"] for task in response.json()] or self.task_ids
+
+    async def list_tasks_range(self, client):
+        start = datetime.date.today() + datetime.timedelta(days=self.rng.randint(-7, 7))
+        await self.recorder.call(
+            "list_tasks_range", client, "GET", f"{self.api}/tasks/get/all-tasks",
+            params={"start_date": start.isoformat(), "end_date": (start + datetime.timedelta(days=30)).isoformat()},
+            headers=self.auth,
+        )
+
+    async def get_task(self, client):
+        if self.task_ids:
+            await self.recorder.call("get_task", client, "GET",
+                                     f"{self.api}/tasks/get/{self.rng.choice(self.task_ids)}", headers=self.auth)
+
+    async def create_task(self, client):
+        due_date = datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=self.rng.randint(1, 30))
+        response = await self.recorder.call(
+            "create_task", client, "POST", f"{self.api}/tasks/create", headers=self.auth,
+            json={
+                "title": "Load test task",
+                "description": "Created by benchmarks.load_test",
+                "due_date": due_date.isoformat(),
+                "priority": self.rng.choice(PRIORITIES),
+            },
+        )
+        if response is not None:
+            self.task_ids.append(response.json()["id"])
+
+    async def update_task(self, client):
+        if self.task_ids:
+            await self.recorder.call(
+                "update_task", client, "PATCH", f"{self.api}/tasks/update/{self.rng.choice(self.task_ids)}",
+                headers=self.auth, json={"completed": self.rng.random() < 0.5},
+            )
+
+    async def delete_task(self, client):
+        if self.task_ids:
+            task_id = self.task_ids.pop(self.rng.randrange(len(self.task_ids)))
+            await self.recorder.call("delete_task", client, "DELETE", f"{self.api}/tasks/delete/{task_id}",
+                                     headers=self.auth)
+
+    async def refresh_token(self, client):
+        response = await self.recorder.call(
+            "refresh_token", client, "POST", f"{self.api}/auth/refresh-token",
+            headers={"Authorization": f"Bearer {self.refresh_token}"},
+        )
+        if response is not None:
+            body = response.json()
+            self.access_token = body["access_token"]
+            self.refresh_token = body["refresh_token"]
+
+    async def profile_details(self, client):
+        await self.recorder.call("profile_details", client, "GET", f"{self.api}/users/profile-details",
+                                 headers=self.auth)
+
+    async def upload_picture(self, client):
+        await self.recorder.call("upload_picture", client, "POST", f"{self.api}/users/upload-picture",
+                                 headers=self.auth, json={"picture": PICTURE})
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(recorder: Recorder, elapsed: float, args) -> dict:
+    endpoints = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        }
+    total = sum(item["requests"] for item in endpoints.values())
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "base_url": args.base_url,
+            "users": args.users,
+            "duration_s": round(elapsed, 2),
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "total_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    print(f"{'endpoint':<20}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}{'rps':>16}")
+    for name, current in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if not before:
+            continue
+        cells = [f"{before[key]:.1f}->{current[key]:.1f}" for key in ("p50_ms", "p95_ms", "p99_ms", "rps")]
+        print(f"{name:<20}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+async def run(args) -> dict:
+    api = args.base_url.rstrip("/") + args.api_prefix
+    recorder = Recorder()
+    headers = {"X-App-Key": args.app_key} if args.app_key else {}
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+        start = time.monotonic()
+        deadline = start + args.duration
+        users = [
+            VirtualUser(i % args.seeded_users, api, recorder, random.Random(args.seed + i))
+            for i in range(args.users)
+        ]
+        await asyncio.gather(*(user.run(client, deadline) for user in users))
+        elapsed = time.monotonic() - start
+
+    return build_report(recorder, elapsed, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--api-prefix", default="/api")
+    parser.add_argument("--app-key", default=None, help="X-App-Key header, needed when going through nginx")
+    parser.add_argument("--users", type=int, default=50, help="concurrent simulated users")
+    parser.add_argument("--seeded-users", type=int, default=200, help="--users value used for benchmarks.seed")
+    parser.add_argument("--duration", type=int, default=60, help="seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2, sort_keys=True)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    print(output)
+
+    if args.baseline:
+        print_comparison(report, json.loads(args.baseline.read_text()))
+
+
+if __name__ == "__main__":
+    main()
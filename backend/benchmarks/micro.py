@@ -0,0 +1,161 @@
+"""
+Micro-benchmarks for hot primitives: token creation/validation, password
+hashing, task schema validation and cookie construction. Runs offline, no
+database or env file is required.
+
+Results are compared with benchmarks/baselines/micro.json and the run fails
+when a benchmark is slower than its baseline by more than --threshold.
+
+Usage:
+    python -m benchmarks.micro                      # compare with the baseline
+    python -m benchmarks.micro --update-baseline    # store current numbers as the new baseline
+    python -m benchmarks.micro --only token         # run benchmarks whose name contains "token"
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+# Placeholder settings so the primitives can be imported without an env file
+for _key, _value in {
+    "ENVIRONMENT": "local", "API_PREFIX": "/api", "DEBUG": "false",
+    "POSTGRES_USER": "bench", "POSTGRES_PASSWORD": "bench", "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432", "ALLOWED_ORIGINS": "",
+    "SECRET_KEY": "bench-secret-key", "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "GOOGLE_CLIENT_ID": "bench", "GOOGLE_CLIENT_SECRET": "bench", "GOOGLE_REDIRECT_URI": "bench",
+    "GOOGLE_AUTH_URL": "bench", "FRONTEND_REDIRECT_SCHEME": "bench", "STATE_SECRET_KEY": "bench",
+    "ADMIN_USERNAME": "bench", "ADMIN_PASSWORD": "bench", "ADMIN_SECRET_KEY": "bench", "NGINX_APP_KEY": "bench",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+from pydantic import TypeAdapter  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+from core.cookies import CookieManager  # noqa: E402
+from core.security import (  # noqa: E402
+    _create_token, validate_token, get_password_hash, verify_password, create_access_token,
+)
+from schemas.tasks import TaskCreate, TaskResponse  # noqa: E402
+
+BASELINE_FILE = Path(__file__).parent / "baselines" / "micro.json"
+LIST_SIZE = 100
+
+
+def run_coroutine(coro):
+    """Drives a coroutine that never suspends, without event loop overhead."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _task_payloads() -> list[dict]:
+    due_date = (datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=1)).isoformat()
+    return [
+        {"title": f"Task {i}", "description": "Some description " * 5, "due_date": due_date, "priority": "high"}
+        for i in range(LIST_SIZE)
+    ]
+
+
+def _task_rows() -> list[SimpleNamespace]:
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        SimpleNamespace(
+            id=i, user_id=1, title=f"Task {i}", description="Some description " * 5, completed=False,
+            due_date=now, priority="high", created_at=now, completed_at=None, notification_id=None,
+            recurrence_rule=None, next_occurrence=None, recurrence_parent_id=None, occurrence_date=None,
+        )
+        for i in range(LIST_SIZE)
+    ]
+
+
+def build_benchmarks() -> dict:
+    access_token = create_access_token({"sub": "42"})
+    password_hash = get_password_hash("correct horse battery staple")
+    task_payloads = _task_payloads()
+    task_rows = _task_rows()
+    create_adapter = TypeAdapter(list[TaskCreate])
+    response_adapter = TypeAdapter(list[TaskResponse])
+    validated_rows = response_adapter.validate_python(task_rows, from_attributes=True)
+
+    def set_cookies():
+        cookies = CookieManager(Response())
+        cookies.set_access_token(access_token)
+        cookies.set_refresh_token(access_token)
+        cookies.set_csrf("csrf-token")
+
+    return {
+        "token.create": lambda: _create_token({"sub": "42"}, datetime.timedelta(minutes=30), "access"),
+        "token.validate": lambda: run_coroutine(validate_token(access_token, "access")),
+        "password.hash": lambda: get_password_hash("correct horse battery staple"),
+        "password.verify": lambda: verify_password("correct horse battery staple", password_hash),
+        f"schema.task_create_list[{LIST_SIZE}]": lambda: create_adapter.validate_python(task_payloads),
+        f"schema.task_response_list[{LIST_SIZE}]": lambda: response_adapter.validate_python(
+            task_rows, from_attributes=True),
+        f"schema.task_response_dump_json[{LIST_SIZE}]": lambda: response_adapter.dump_json(validated_rows),
+        "cookies.set_all": set_cookies,
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    """Median time per call in microseconds."""
+    number, _ = timeit.Timer(fn).autorange()
+    samples = timeit.repeat(fn, number=number, repeat=repeat)
+    return statistics.median(samples) / number * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=None, help="substring filter on benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, 0.25 means 25%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {"results": {}}
+    results = {}
+    regressions = []
+
+    print(f"{'benchmark':<40}{'us/call':>12}{'baseline':>12}{'change':>10}")
+    for name, fn in build_benchmarks().items():
+        if args.only and args.only not in name:
+            continue
+        current = measure(fn, args.repeat)
+        results[name] = round(current, 2)
+
+        previous = baseline["results"].get(name)
+        if previous:
+            change = (current - previous) / previous
+            flag = "  REGRESSION" if change > args.threshold else ""
+            print(f"{name:<40}{current:>12.2f}{previous:>12.2f}{change:>+10.1%}{flag}")
+            if flag:
+                regressions.append(name)
+        else:
+            print(f"{name:<40}{current:>12.2f}{'-':>12}{'-':>10}")
+
+    if args.update_baseline:
+        BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # Kept: "notes" explains entries re-measured separately from the rest
+        baseline = {
+            **baseline,
+            "meta": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()},
+            "results": {**baseline["results"], **results},
+        }
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Seeds benchmark users and tasks into the configured (local!) database.
+
+Every user gets the same password so the load test can log in as any of them.
+Running it again only tops up missing users and tasks.
+
+Usage: python -m benchmarks.seed [--users 200] [--tasks-per-user 100]
+"""
+import argparse
+import asyncio
+import datetime
+import random
+
+from sqlalchemy import select, func, insert
+
+from benchmarks import BENCH_EMAIL_TEMPLATE, BENCH_PASSWORD, PRIORITIES
+from core.config import settings
+from core.security import get_password_hash
+from db.database import SessionLocal, engine
+from models.tasks import Task
+from models.users import User
+
+
+def _task_rows(user_id: int, count: int, rng: random.Random) -> list[dict]:
+    now = datetime.datetime.now(datetime.UTC)
+    rows = []
+    for i in range(count):
+        completed = rng.random() < 0.3
+        due_date = now + datetime.timedelta(days=rng.randint(-30, 60), hours=rng.randint(0, 23))
+        rows.append({
+            "user_id": user_id,
+            "title": f"Benchmark task {i}",
+            "description": "Lorem ipsum dolor sit amet. " * rng.randint(0, 20),
+            "due_date": due_date,
+            "priority": rng.choice(PRIORITIES),
+            "completed": completed,
+            "completed_at": due_date if completed else None,
+        })
+    return rows
+
+
+async def seed(users: int, tasks_per_user: int, seed_value: int) -> None:
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError("Refusing to seed benchmark data into a production database.")
+
+    rng = random.Random(seed_value)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    async with SessionLocal() as db:
+        for i in range(users):
+            email = BENCH_EMAIL_TEMPLATE.format(i)
+            user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+            if not user:
+                user = User(
+                    email=email,
+                    hashed_password=hashed_password,
+                    full_name=f"Bench User {i}",
+                    is_active=True,
+                    auth_provider="local",
+                )
+                db.add(user)
+                await db.flush()
+
+            existing = await db.scalar(select(func.count(Task.id)).where(Task.user_id == user.id))
+            missing = tasks_per_user - existing
+            if missing > 0:
+                await db.execute(insert(Task), _task_rows(user.id, missing, rng))
+            await db.commit()
+
+    await engine.dispose()
+    print(f"Seeded {users} users with {tasks_per_user} tasks each (password: {BENCH_PASSWORD!r}).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks-per-user", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1, help="random seed, keeps runs reproducible")
+    args = parser.parse_args()
+    asyncio.run(seed(args.users, args.tasks_per_user, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Profiles how long importing the app takes, as each gunicorn worker (or the
+master with --preload) does on a cold start. Runs `import main` in fresh
+interpreters with -X importtime and reports the median total and the slowest
+top-level packages by cumulative import time.
+
+Usage: python -m benchmarks.startup [--runs 5] [--top 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def profile_import(module: str) -> tuple[int, dict[str, int]]:
+    """
+    Total import time of the module and the cumulative time of its direct
+    imports grouped by top-level package, in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    children: dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        # Children are printed before their parent
+        if depth == 1:
+            children[name.split(".")[0]] += int(cumulative)
+        elif depth == 0:
+            if name == module:
+                return int(cumulative), dict(children)
+            children.clear()
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    total = statistics.median(run_total for run_total, _ in runs)
+    names = {name for _, packages in runs for name in packages}
+    packages = {name: statistics.median(run.get(name, 0) for _, run in runs) for name in names}
+
+    print(f"import {args.module}: {total / 1000:.1f} ms (median of {args.runs} runs)")
+    print(f"{'package':<30}{'ms':>10}")
+    for name, micros in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<30}{micros / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
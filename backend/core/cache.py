@@ -0,0 +1,286 @@
+"""
+Cache shared by the app, e.g. for user principals, Google's JWKS and rate limits.
+
+CACHE_BACKEND=local keeps an LRU per worker process, CACHE_BACKEND=redis
+shares one Redis (or any server speaking its protocol) between all workers
+and instances. Keys live in namespaces that can be invalidated as a whole,
+and hits and misses are counted per namespace.
+"""
+import abc
+import base64
+import datetime
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Can't cache a {type(value).__name__}")
+
+
+def _decode(obj: dict) -> Any:
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    if "__datetime__" in obj:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def dumps(value: Any) -> str:
+    """JSON with bytes and datetimes tagged, data read back from a shared store is never unpickled."""
+    return json.dumps(value, default=_encode)
+
+
+def loads(raw: str | bytes) -> Any:
+    return json.loads(raw, object_hook=_decode)
+
+
+class Cache(abc.ABC):
+    """
+    Backend independent part: get_or_set, per namespace hit/miss counters and
+    fallbacks, a failing backend degrades to cache misses instead of errors.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    async def get(self, namespace: str, key: Hashable) -> Any:
+        """Cached value or None."""
+        try:
+            value = await self._get(namespace, key)
+        except Exception as e:
+            logger.warning(f"Cache get failed for {namespace}:{key}: {e}")
+            value = None
+        if value is None:
+            self.misses[namespace] += 1
+        else:
+            self.hits[namespace] += 1
+        return value
+
+    async def set(self, namespace: str, key: Hashable, value: Any, ttl: int) -> None:
+        try:
+            await self._set(namespace, key, value, ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed for {namespace}:{key}: {e}")
+
+    async def get_or_set(
+            self,
+            namespace: str,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: int,
+    ) -> Any:
+        """Cached value, or the loader's result which is cached unless it's None."""
+        value = await self.get(namespace, key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                await self.set(namespace, key, value, ttl)
+        return value
+
+    async def delete(self, namespace: str, key: Hashable) -> None:
+        try:
+            await self._delete(namespace, key)
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {namespace}:{key}: {e}")
+
+    async def invalidate(self, namespace: str) -> None:
+        """Drop every key of the namespace."""
+        try:
+            await self._invalidate(namespace)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+
+    async def incr(self, namespace: str, key: Hashable, ttl: int, amount: int = 1) -> int:
+        """Atomically add to a counter, created with the given TTL. Errors are raised."""
+        return await self._incr(namespace, key, ttl, amount)
+
+    async def add(self, namespace: str, key: Hashable, value: Any, ttl: int) -> Any:
+        """
+        Atomically store the value unless the key exists. Returns None when it
+        was stored, else the existing value. Errors are raised.
+        """
+        return await self._add(namespace, key, value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace in sorted(self.hits.keys() | self.misses.keys()):
+            hits, misses = self.hits[namespace], self.misses[namespace]
+            namespaces[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        # Counters are per worker process, like the local backend's entries
+        return {"backend": self.backend, "pid": os.getpid(), "namespaces": namespaces}
+
+    async def close(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def _get(self, namespace: str, key: Hashable) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def _set(self, namespace: str, key: Hashable, value: Any, ttl: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _delete(self, namespace: str, key: Hashable) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _invalidate(self, namespace: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def _add(self, namespace: str, key: Hashable, value: Any, ttl: int) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def _incr(self, namespace: str, key: Hashable, ttl: int, amount: int) -> int:
+        ...
+
+
+class LocalCache(Cache):
+    """In-process LRU with per entry expiry, bounded to max_entries."""
+
+    backend = "local"
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, Hashable], Tuple[float, Any]] = OrderedDict()
+
+    def _live(self, namespace: str, key: Hashable) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[(namespace, key)]
+            return None
+        self._entries.move_to_end((namespace, key))
+        return entry
+
+    def _store(self, namespace: str, key: Hashable, expires_at: float, value: Any) -> None:
+        self._entries[(namespace, key)] = (expires_at, value)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get(self, namespace: str, key: Hashable) -> Any:
+        entry = self._live(namespace, key)
+        return None if entry is None else entry[1]
+
+    async def _set(self, namespace: str, key: Hashable, value: Any, ttl: int) -> None:
+        self._store(namespace, key, time.monotonic() + ttl, value)
+
+    async def _delete(self, namespace: str, key: Hashable) -> None:
+        self._entries.pop((namespace, key), None)
+
+    async def _invalidate(self, namespace: str) -> None:
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+            del self._entries[entry_key]
+
+    async def _add(self, namespace: str, key: Hashable, value: Any, ttl: int) -> Any:
+        entry = self._live(namespace, key)
+        if entry is not None:
+            return entry[1]
+        self._store(namespace, key, time.monotonic() + ttl, value)
+        return None
+
+    async def _incr(self, namespace: str, key: Hashable, ttl: int, amount: int) -> int:
+        entry = self._live(namespace, key)
+        expires_at, value = entry if entry is not None else (time.monotonic() + ttl, 0)
+        self._store(namespace, key, expires_at, value + amount)
+        return value + amount
+
+
+class RedisCache(Cache):
+    """
+    Shared cache on Redis, values are stored as JSON (see dumps). Needs the `redis` package, the
+    client is created on first use so each forked worker opens its own connections.
+    """
+
+    backend = "redis"
+    INVALIDATE_BATCH_SIZE = 500
+
+    def __init__(self, url: str, prefix: str):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                from redis import asyncio as redis
+            except ImportError:
+                raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)")
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    async def _get(self, namespace: str, key: Hashable) -> Any:
+        raw = await self.client.get(self._key(namespace, key))
+        return None if raw is None else loads(raw)
+
+    async def _set(self, namespace: str, key: Hashable, value: Any, ttl: int) -> None:
+        await self.client.set(self._key(namespace, key), dumps(value), ex=ttl)
+
+    async def _delete(self, namespace: str, key: Hashable) -> None:
+        await self.client.delete(self._key(namespace, key))
+
+    async def _invalidate(self, namespace: str) -> None:
+        batch = []
+        async for redis_key in self.client.scan_iter(match=f"{self.prefix}:{namespace}:*", count=self.INVALIDATE_BATCH_SIZE):
+            batch.append(redis_key)
+            if len(batch) >= self.INVALIDATE_BATCH_SIZE:
+                await self.client.unlink(*batch)
+                batch = []
+        if batch:
+            await self.client.unlink(*batch)
+
+    async def _add(self, namespace: str, key: Hashable, value: Any, ttl: int) -> Any:
+        # SET NX GET needs Redis 7
+        existing = await self.client.set(self._key(namespace, key), dumps(value), ex=ttl, nx=True, get=True)
+        return None if existing is None else loads(existing)
+
+    async def _incr(self, namespace: str, key: Hashable, ttl: int, amount: int) -> int:
+        redis_key = self._key(namespace, key)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(redis_key, 0, ex=ttl, nx=True)
+            pipe.incrby(redis_key, amount)
+            _, value = await pipe.execute()
+        return value
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_cache() -> Cache:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(settings.CACHE_URL, settings.CACHE_KEY_PREFIX)
+    return LocalCache(settings.CACHE_MAX_ENTRIES)
+
+
+cache = build_cache()
@@ -14,6 +14,48 @@ class Settings(BaseSettings):
     API_PREFIX: str
     DEBUG: bool
     DATABASE_URL: Optional[str] = None
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: int = 10
+    READ_YOUR_WRITES_WINDOW_SECONDS: int = 5
+    DATABASE_SERVER_SIDE_PREPARE: bool = True
+    DATABASE_PREPARE_THRESHOLD: int = 2
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLED_LOGGERS: str = "uvicorn.access,services.reminders"
+    HEALTH_CHECK_INTERVAL_SECONDS: int = 5
+    HEALTH_CHECK_TIMEOUT_SECONDS: int = 2
+    MIGRATION_LOCK_TIMEOUT: str = "5s"
+    LAST_LOGIN_FLUSH_INTERVAL_SECONDS: int = 10
+    REMINDER_LEAD_MINUTES: int = 15
+    REMINDER_HORIZON_SECONDS: int = 300
+    REMINDER_BATCH_SIZE: int = 1000
+    REMINDER_NOTIFIER: str = "log"
+    TASK_ARCHIVE_AFTER_DAYS: int = 90
+    TASK_ARCHIVE_BATCH_SIZE: int = 1000
+    TASK_ARCHIVE_INTERVAL_SECONDS: int = 3600
+    CACHE_BACKEND: Literal["local", "redis"] = "local"
+    CACHE_URL: str = "redis://redis:6379/0"
+    CACHE_KEY_PREFIX: str = "tasks"
+    CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 5
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    IDEMPOTENCY_TTL_SECONDS: int = 3600
+    IDEMPOTENCY_WAIT_SECONDS: int = 10
+    COMPRESSION_ENCODINGS: str = "gzip"
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 4
+    PROFILING_ON_DEMAND: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_OUTPUT_DIR: str = ""
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    LOGIN_IP_RATE_LIMIT: int = 20
+    LOGIN_ACCOUNT_RATE_LIMIT: int = 5
+    REGISTRATION_IP_RATE_LIMIT: int = 5
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
@@ -33,6 +75,7 @@ class Settings(BaseSettings):
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
     ADMIN_SECRET_KEY: str
+    ADMIN_TOKEN: Optional[str] = None
     NGINX_APP_KEY: str
 
     @model_validator(mode='after')
@@ -54,6 +97,22 @@ class Settings(BaseSettings):
     def parse_allowed_origins(cls, v: str) -> List[str]:
         return v.split(",") if v else []
 
+    @field_validator("DATABASE_REPLICA_URLS")
+    def parse_replica_urls(cls, v: str) -> List[str]:
+        return [url.strip() for url in v.split(",") if url.strip()] if v else []
+
+    @field_validator("LOG_SAMPLED_LOGGERS")
+    def parse_sampled_loggers(cls, v: str) -> List[str]:
+        return [name.strip() for name in v.split(",") if name.strip()]
+
+    @field_validator("COMPRESSION_ENCODINGS")
+    def parse_compression_encodings(cls, v: str) -> List[str]:
+        encodings = [encoding.strip().lower() for encoding in v.split(",") if encoding.strip()]
+        unknown = set(encodings) - {"gzip", "br", "zstd"}
+        if unknown:
+            raise ValueError(f"Unknown compression encodings: {', '.join(sorted(unknown))}")
+        return encodings
+
 
     @staticmethod
     def get_env_file() -> Path:
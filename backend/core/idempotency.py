@@ -0,0 +1,181 @@
+"""
+Idempotency-Key support for the mutating task routes. The first request with
+a key runs and its response is stored for IDEMPOTENCY_TTL_SECONDS, retries
+with the same key get the stored response back without running the route
+again. A duplicate arriving while the first one is still running waits for
+its result (single flight), and runs itself if the first one fails with a
+server error, which isn't stored.
+
+Keys are scoped per user and live in the cache. With the default
+CACHE_BACKEND=local each worker process has its own keys, so a retry
+that lands on another worker runs again: deployments with more than one
+worker need CACHE_BACKEND=redis for Idempotency-Key to hold.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from core.cache import cache
+from core.config import settings
+from core.security import validate_token
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_NAMESPACE = "idempotency"
+IDEMPOTENCY_LOCK_NAMESPACE = "idempotency_lock"
+MAX_KEY_LENGTH = 255
+# Waiters poll with backoff, one in the same worker as the running request is woken when it ends
+MIN_POLL_INTERVAL_SECONDS = 0.05
+MAX_POLL_INTERVAL_SECONDS = 0.5
+# Longer than any task write takes, frees the key if a worker dies mid request
+LOCK_TTL_SECONDS = 60
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+async def _user_id(request: Request) -> Optional[str]:
+    """Verified token subject, requests without a valid token are left to the route to reject."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = await validate_token(token, expected_type="access")
+    except Exception:
+        return None
+    return payload.get("sub")
+
+
+def _replay(record: dict, fingerprint: str) -> Response:
+    if record["fingerprint"] != fingerprint:
+        return JSONResponse(
+            status_code=422,
+            content={"detail": f"{IDEMPOTENCY_HEADER} was already used for a different request"},
+        )
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type=record["media_type"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _claim(key: str) -> bool:
+    return await cache.incr(IDEMPOTENCY_LOCK_NAMESPACE, key, ttl=LOCK_TTL_SECONDS) == 1
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, path_prefix: str):
+        super().__init__(app)
+        self.path_prefix = path_prefix
+        # Keys of the requests this worker is running, set when they end
+        self._finished: Dict[str, asyncio.Event] = {}
+        if cache.backend == "local":
+            logger.warning(
+                f"{IDEMPOTENCY_HEADER} keys are kept per worker process with CACHE_BACKEND=local, "
+                f"use CACHE_BACKEND=redis when running more than one worker"
+            )
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if (
+                not idempotency_key
+                or request.method not in MUTATING_METHODS
+                or not request.url.path.startswith(self.path_prefix)
+        ):
+            return await call_next(request)
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return JSONResponse(status_code=400, content={"detail": f"{IDEMPOTENCY_HEADER} is too long"})
+
+        user_id = await _user_id(request)
+        if user_id is None:
+            return await call_next(request)
+
+        key = f"{user_id}:{idempotency_key}"
+        body = await request.body()
+        fingerprint = hashlib.sha256(
+            b"\n".join([request.method.encode(), request.url.path.encode(), request.url.query.encode(), body])
+        ).hexdigest()
+
+        record = await cache.get(IDEMPOTENCY_NAMESPACE, key)
+        if record is not None:
+            return _replay(record, fingerprint)
+
+        try:
+            claimed = await _claim(key)
+        except Exception as e:
+            logger.warning(f"Idempotency store unavailable, running request without it: {e}")
+            return await call_next(request)
+
+        if not claimed:
+            return await self._wait_for_result(request, call_next, key, fingerprint)
+        return await self._run(request, call_next, key, fingerprint)
+
+    async def _run(self, request: Request, call_next, key: str, fingerprint: str) -> Response:
+        """Runs the request holding the key's lock, stores its response unless it's a server error."""
+        finished = self._finished[key] = asyncio.Event()
+        try:
+            # The previous holder stores its result before releasing the lock we just claimed
+            record = await cache.get(IDEMPOTENCY_NAMESPACE, key)
+            if record is not None:
+                return _replay(record, fingerprint)
+
+            response = await call_next(request)
+            response_body = b"".join([chunk async for chunk in response.body_iterator])
+
+            # Server errors are not stored, a retry or a waiting duplicate runs the request again
+            if response.status_code < 500:
+                await cache.set(IDEMPOTENCY_NAMESPACE, key, {
+                    "fingerprint": fingerprint,
+                    "status_code": response.status_code,
+                    "media_type": response.media_type or response.headers.get("content-type"),
+                    "body": response_body,
+                }, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+        finally:
+            await cache.delete(IDEMPOTENCY_LOCK_NAMESPACE, key)
+            if self._finished.get(key) is finished:
+                del self._finished[key]
+            finished.set()
+
+        return Response(
+            content=response_body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            background=response.background,
+        )
+
+    async def _wait_for_result(self, request: Request, call_next, key: str, fingerprint: str) -> Response:
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        interval = MIN_POLL_INTERVAL_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            finished = self._finished.get(key)
+            if finished is None:
+                await asyncio.sleep(min(interval, remaining))
+            else:
+                try:
+                    await asyncio.wait_for(finished.wait(), min(interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+            interval = min(interval * 2, MAX_POLL_INTERVAL_SECONDS)
+
+            record = await cache.get(IDEMPOTENCY_NAMESPACE, key)
+            if record is not None:
+                return _replay(record, fingerprint)
+            # No result and the lock is free: the first request failed, this one takes over
+            try:
+                claimed = await _claim(key)
+            except Exception as e:
+                logger.warning(f"Idempotency store unavailable while waiting for {key}: {e}")
+                continue
+            if claimed:
+                return await self._run(request, call_next, key, fingerprint)
+        return JSONResponse(
+            status_code=409,
+            content={"detail": f"A request with this {IDEMPOTENCY_HEADER} is still in progress"},
+        )
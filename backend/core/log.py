@@ -0,0 +1,204 @@
+"""
+Logging setup: structured JSON lines on stdout, written by a background thread.
+
+Handlers on the event loop only put records on a bounded queue, formatting
+and the write to stdout happen in a QueueListener thread. When stdout can't
+keep up and the queue is full, records are dropped (and the drops reported)
+instead of blocking requests. Every record carries the id of the request it
+was logged in, see RequestIdMiddleware. INFO records of the loggers in
+LOG_SAMPLED_LOGGERS, e.g. the access log, are kept at LOG_SAMPLE_RATE.
+
+Modules log through logging.getLogger(__name__), setup_logging() is called
+once per process by main and the scripts.
+"""
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming ids are reused (e.g. nginx's $request_id) if they look sane
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Server loggers configured by uvicorn/gunicorn with handlers of their own
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error", "gunicorn.access")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, extra={...} fields included as they are."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Runs in the thread that logs the record, while the request's context is current."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps INFO and lower records of the given loggers at the given rate, everything else always."""
+
+    def __init__(self, rate: float, loggers: Sequence[str]):
+        super().__init__()
+        self.rate = rate
+        self.loggers = tuple(loggers)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno > logging.INFO or not record.name.startswith(self.loggers):
+            return True
+        if random.random() >= self.rate:
+            return False
+        # Lets counts be scaled back up
+        record.sample_rate = self.rate
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler on a bounded queue that drops records rather than wait for room."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the message here, JSON formatting happens on the listener thread
+        record = copy.copy(record)
+        if record.name == "uvicorn.access" and isinstance(record.args, tuple) and len(record.args) == 5:
+            record.client, record.method, record.path, record.http_version, record.status_code = record.args
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"Dropped {dropped} log records, stdout is not keeping up",
+                }))
+            except queue.Full:
+                self.dropped += dropped
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _start_listener() -> None:
+    global _listener
+    # A fresh queue, the old one's lock may have been held by a thread that didn't survive a fork
+    _handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = QueueListener(_handler.queue, _output_handler(), respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out what is queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+        _listener = None
+
+
+def setup_logging() -> None:
+    """
+    Route the root logger through the queue, idempotent. Called again after
+    the server configured its loggers (gunicorn post_worker_init), so their
+    records go through the same pipeline instead of their own handlers.
+    """
+    global _handler
+    if _handler is None:
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLED_LOGGERS))
+        _handler.addFilter(RequestIdFilter())
+        _start_listener()
+
+        root = logging.getLogger()
+        root.handlers = [_handler]
+        root.setLevel(settings.LOG_LEVEL.upper())
+        atexit.register(stop_logging)
+        # Threads don't survive a fork, gunicorn --preload forks the workers after main set this up
+        os.register_at_fork(after_in_child=_start_listener)
+
+    for name in SERVER_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+
+
+class RequestIdMiddleware:
+    """Sets the request id for logging and echoes it in the X-Request-ID response header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER, "")
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
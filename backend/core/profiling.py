@@ -0,0 +1,203 @@
+"""
+Request profiling with pyinstrument's sampling profiler (optional dependency,
+`pip install pyinstrument`). Two modes, both off by default, without either
+the middleware isn't installed and costs nothing:
+
+- On demand (PROFILING_ON_DEMAND): a request with `X-Profile: speedscope`
+  (or html, text) and a valid X-Admin-Token runs under the profiler and gets
+  the profile back instead of its response, whose status is in
+  X-Profiled-Status. Open speedscope files on https://www.speedscope.app.
+  With PROFILING_OUTPUT_DIR the profile is also saved there.
+- Sampling (PROFILING_SAMPLE_RATE > 0): that share of all requests is
+  profiled and the profiles are combined per route, in memory of the worker,
+  see /admin/profiles.
+
+The profiler follows the request's own task, concurrent requests don't show
+up in its profile. Streaming responses never finish, so don't profile them.
+"""
+import datetime
+import logging
+import random
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.security import verify_admin
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+# Format -> (media type, file extension)
+PROFILE_FORMATS = {
+    "speedscope": ("application/json", "speedscope.json"),
+    "html": ("text/html", "html"),
+    "text": ("text/plain", "txt"),
+}
+# Combined sessions keep every sample, cap them so memory stays bounded
+MAX_SAMPLES_PER_ROUTE = 200
+
+
+def _profiler(interval: float):
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        raise RuntimeError("Profiling requires the pyinstrument package (pip install pyinstrument)")
+    return Profiler(interval=interval, async_mode="enabled")
+
+
+def render_profile(session, profile_format: str) -> bytes:
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+
+    if profile_format == "speedscope":
+        renderer = SpeedscopeRenderer()
+    elif profile_format == "html":
+        renderer = HTMLRenderer()
+    else:
+        renderer = ConsoleRenderer(unicode=True, color=False, show_all=False)
+    return renderer.render(session).encode()
+
+
+def profile_response(session, profile_format: str, name: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    media_type, extension = PROFILE_FORMATS[profile_format]
+    return Response(
+        content=render_profile(session, profile_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"', **(headers or {})},
+    )
+
+
+class RouteProfiles:
+    """Sampled profiles of this worker, combined per route."""
+
+    def __init__(self):
+        self._sessions: Dict[str, Any] = {}
+        self._samples: Dict[str, int] = {}
+
+    def add(self, route: str, session) -> None:
+        from pyinstrument.session import Session
+
+        if self._samples.get(route, 0) >= MAX_SAMPLES_PER_ROUTE:
+            return
+        existing = self._sessions.get(route)
+        self._sessions[route] = session if existing is None else Session.combine(existing, session)
+        self._samples[route] = self._samples.get(route, 0) + 1
+
+    def get(self, route: str):
+        return self._sessions.get(route)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Routes by total profiled time, slowest first."""
+        routes = [
+            {
+                "route": route,
+                "samples": self._samples[route],
+                "total_seconds": round(session.duration, 4),
+                "mean_seconds": round(session.duration / self._samples[route], 4),
+            }
+            for route, session in self._sessions.items()
+        ]
+        return sorted(routes, key=lambda route: route["total_seconds"], reverse=True)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+        self._samples.clear()
+
+
+route_profiles = RouteProfiles()
+
+
+def _route_key(scope: Scope) -> str:
+    # The router stores the matched route in the scope, templated paths keep ids out of the key
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, on_demand: bool, sample_rate: float, interval: float, output_dir: str = ""):
+        self.app = app
+        self.on_demand = on_demand
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.output_dir = Path(output_dir) if output_dir else None
+        # Fail at startup rather than on the first profiled request
+        _profiler(interval)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.on_demand:
+            headers = Headers(scope=scope)
+            profile_format = headers.get(PROFILE_HEADER)
+            if profile_format is not None:
+                await self._profile_request(scope, receive, send, profile_format.lower(), headers)
+                return
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            await self._sample(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _profile_request(self, scope: Scope, receive: Receive, send: Send, profile_format: str, headers: Headers) -> None:
+        try:
+            await verify_admin(headers.get("X-Admin-Token", ""))
+        except HTTPException as e:
+            await JSONResponse(status_code=e.status_code, content={"detail": e.detail})(scope, receive, send)
+            return
+        if profile_format not in PROFILE_FORMATS:
+            await JSONResponse(
+                status_code=400,
+                content={"detail": f"{PROFILE_HEADER} must be one of {', '.join(PROFILE_FORMATS)}"},
+            )(scope, receive, send)
+            return
+
+        # The profile replaces the response, only its status is passed on
+        status_code = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profiler = _profiler(self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+
+        session = profiler.last_session
+        route = _route_key(scope)
+        name = f"{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_')}-{datetime.datetime.now(datetime.UTC):%Y%m%dT%H%M%S}"
+        response = profile_response(session, profile_format, name, {
+            "X-Profiled-Status": str(status_code),
+            "X-Profiled-Duration": f"{session.duration:.4f}",
+        })
+        if self.output_dir is not None:
+            self._save(name, profile_format, response.body)
+        await response(scope, receive, send)
+
+    async def _sample(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = _profiler(self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            route_profiles.add(_route_key(scope), profiler.last_session)
+
+    def _save(self, name: str, profile_format: str, content: bytes) -> None:
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / f"{name}.{PROFILE_FORMATS[profile_format][1]}"
+            path.write_bytes(content)
+            logger.info(f"Saved profile {path}")
+        except OSError as e:
+            logger.warning(f"Failed to save profile {name}: {e}")
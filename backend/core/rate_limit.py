@@ -0,0 +1,114 @@
+"""
+Rate limits for endpoints that are expensive to abuse, login and registration
+verify or compute Argon2 hashes. Counters live in the shared cache, so with
+CACHE_BACKEND=redis the limits hold across workers and instances.
+
+The dependencies run before the endpoint body, so rejected requests never
+reach the password hashing.
+"""
+import logging
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from starlette import status
+from starlette.exceptions import HTTPException
+
+from core.cache import Cache, cache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_NAMESPACE = "rate_limit"
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    window_seconds: int
+
+
+class RateLimiter:
+    """
+    Sliding window counters: the count of the current fixed window plus the
+    previous window's count weighted by how much of it still overlaps the
+    sliding window. Needs only atomic increments from the store, which both
+    cache backends provide.
+    """
+
+    def __init__(self, store: Cache):
+        self.store = store
+        self.rejections: Dict[str, int] = defaultdict(int)
+
+    async def hit(self, key: str, rule: RateLimit, now: Optional[float] = None) -> Optional[int]:
+        """Count a request, returns the seconds until it would be allowed if over the limit."""
+        now = time.time() if now is None else now
+        window, offset = divmod(now, rule.window_seconds)
+        window = int(window)
+        current = await self.store.incr(RATE_LIMIT_NAMESPACE, f"{key}:{window}", ttl=2 * rule.window_seconds)
+        previous = await self.store.incr(RATE_LIMIT_NAMESPACE, f"{key}:{window - 1}", ttl=rule.window_seconds, amount=0)
+
+        overlap = 1 - offset / rule.window_seconds
+        if previous * overlap + current <= rule.limit:
+            return None
+        # Until the weighted previous window has decayed enough, or the next window at the latest
+        if previous and current <= rule.limit:
+            retry_after = (previous * overlap + current - rule.limit) / previous * rule.window_seconds
+        else:
+            retry_after = rule.window_seconds - offset
+        return max(1, math.ceil(retry_after))
+
+    async def check(self, scope: str, limits: Iterable[Tuple[str, str, RateLimit]]) -> None:
+        """
+        Raise 429 when any of the (kind, identity, limit) counters is exceeded.
+        Store failures let the request through, the limiter must not take logins down.
+        """
+        for kind, identity, rule in limits:
+            try:
+                retry_after = await self.hit(f"{scope}:{kind}:{identity}", rule)
+            except Exception as e:
+                logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+                return
+            if retry_after is not None:
+                self.rejections[f"{scope}:{kind}"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.rejections)
+
+
+rate_limiter = RateLimiter(cache)
+
+
+def _client_ip(request: Request) -> str:
+    # uvicorn applies X-Forwarded-For (--forwarded-allow-ips), nginx overwrites it with
+    # $remote_addr rather than appending to it, so clients can't pick their own IP
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    """Per client IP against credential stuffing, per account against guessing one password."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    window = settings.RATE_LIMIT_WINDOW_SECONDS
+    await rate_limiter.check("login", [
+        ("ip", _client_ip(request), RateLimit(settings.LOGIN_IP_RATE_LIMIT, window)),
+        ("account", form_data.username.strip().lower(), RateLimit(settings.LOGIN_ACCOUNT_RATE_LIMIT, window)),
+    ])
+
+
+async def limit_registration(request: Request) -> None:
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    window = settings.RATE_LIMIT_WINDOW_SECONDS
+    await rate_limiter.check("register", [
+        ("ip", _client_ip(request), RateLimit(settings.REGISTRATION_IP_RATE_LIMIT, window)),
+    ])
@@ -1,5 +1,5 @@
 import datetime
-import time
+import logging
 import uuid
 import hmac
 from typing import Dict, Any, Optional
@@ -7,11 +7,14 @@ from typing import Dict, Any, Optional
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from fastapi import Header
-from httpx import AsyncClient
 from jose import jwt, JWTError, ExpiredSignatureError, jwk
 from starlette import status
 from starlette.exceptions import HTTPException
+from core.cache import cache
 from core.config import settings
+from services.token_revocations import revocation_list, token_family
+
+logger = logging.getLogger(__name__)
 
 pwd_hasher = PasswordHasher()
 
@@ -29,10 +32,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except VerifyMismatchError:
         return False
     except Exception as e:
-        print(f"An error occurred during password verification: {e}")
+        logger.exception(f"An error occurred during password verification: {e}")
         return False
 
 
+def new_token_family() -> str:
+    """
+    Id shared by the refresh tokens rotated from one login (claim "fam"), and by
+    the access tokens issued with them. Revoking the family ends the session.
+    """
+    return str(uuid.uuid4())
+
+
 def create_access_token(data: dict):
     expires_delta = datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return _create_token(data, expires_delta, "access")
@@ -67,6 +78,9 @@ async def validate_token(token: str, expected_type: str):
         if expected_type and payload.get("type") != expected_type:
             raise JWTError(f"Invalid token type. Expected: {expected_type}")
 
+        if revocation_list.is_revoked(token_family(payload)):
+            raise JWTError("Token revoked")
+
         exp_timestamp = payload.get("exp")
         if exp_timestamp and datetime.datetime.now(datetime.UTC) > datetime.datetime.fromtimestamp(exp_timestamp,
                                                                                                    tz=datetime.timezone.utc):
@@ -92,34 +106,33 @@ async def validate_token(token: str, expected_type: str):
 
 
 async def verify_admin(x_admin_token: str = Header(...)) -> str:
-    if not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
         raise HTTPException(status_code=403, detail="Invalid admin token")
     return x_admin_token
 
 
 GOOGLE_KEYS_URL = "https://www.googleapis.com/oauth2/v3/certs"
-google_public_keys: Dict[str, Any] = {}
-last_key_fetch_time: float = 0
 KEY_CACHE_LIFETIME_SECONDS = 3600
 
 
-async def get_google_public_keys():
-    """
-    Fetches and caches Google's public keys for verifying ID tokens.
-    """
-    global google_public_keys, last_key_fetch_time
+async def _fetch_google_jwks() -> Dict[str, Any]:
+    # Imported lazily, only the Google login flow needs an HTTP client
+    from httpx import AsyncClient
+
+    async with AsyncClient() as client:
+        response = await client.get(GOOGLE_KEYS_URL)
+        response.raise_for_status()
+        jwks = response.json()
 
-    current_time = time.time()
-    if not google_public_keys or (current_time - last_key_fetch_time > KEY_CACHE_LIFETIME_SECONDS):
-        async with AsyncClient() as client:
-            response = await client.get(GOOGLE_KEYS_URL)
-            response.raise_for_status()
-            jwks = response.json()
+    return {key['kid']: key for key in jwks['keys']}
 
-            google_public_keys = {key['kid']: jwk.construct(key) for key in jwks['keys']}
-            last_key_fetch_time = current_time
 
-    return google_public_keys
+async def get_google_public_keys() -> Dict[str, Any]:
+    """
+    Google's public keys (JWKs by kid) for verifying ID tokens, fetched once
+    per cache lifetime and shared by all workers through the cache.
+    """
+    return await cache.get_or_set("google_jwks", "certs", _fetch_google_jwks, ttl=KEY_CACHE_LIFETIME_SECONDS)
 
 
 async def verify_google_id_token(token: str, client_id: str, access_token: Optional[str] = None) -> dict:
@@ -134,11 +147,11 @@ async def verify_google_id_token(token: str, client_id: str, access_token: Optio
         if not kid:
             raise JWTError("'kid' not found in token header")
 
-        public_key = keys.get(kid)
-        if not public_key:
+        key = keys.get(kid)
+        if not key:
             raise JWTError("Public key not found")
 
-        pem_key = public_key.to_pem().decode('utf-8')
+        pem_key = jwk.construct(key).to_pem().decode('utf-8')
         payload = jwt.decode(
             token=token,
             key=pem_key,
@@ -1,17 +1,41 @@
-from typing import cast
+import logging
 
-from sqlalchemy import Engine
+from contextlib import asynccontextmanager
+from typing import cast, Optional
+
+from fastapi import Request
+from jose import jwt, JWTError
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.util import await_only
+from core.cache import cache
 from core.config import settings
+from db.replicas import ReplicaRouter
+
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
+# psycopg prepares a statement server-side once it has run prepare_threshold times
+# on a connection. Must be disabled behind a transaction-pooling pgbouncer.
+engine_options = dict(
     pool_size=10,
     max_overflow=20,
     pool_pre_ping=True,
-    echo=False
+    echo=False,
+    connect_args={
+        "prepare_threshold": settings.DATABASE_PREPARE_THRESHOLD if settings.DATABASE_SERVER_SIDE_PREPARE else None
+    },
+)
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options)
+
+replica_router = ReplicaRouter(
+    engines=[create_async_engine(url, **engine_options) for url in settings.DATABASE_REPLICA_URLS],
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+    sticky_window=settings.READ_YOUR_WRITES_WINDOW_SECONDS,
+    cache=cache,
 )
 
 SessionLocal = sessionmaker(
@@ -37,6 +61,61 @@ async def get_db():
         yield session
 
 
+def _token_subject(request: Request) -> Optional[int]:
+    """
+    Reads the user id from the bearer token without verifying it.
+    Only used to decide where to route reads, authentication happens separately.
+    """
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        sub = jwt.get_unverified_claims(token).get("sub")
+        return int(sub) if sub else None
+    except (JWTError, ValueError):
+        return None
+
+
+@asynccontextmanager
+async def read_session(user_id: Optional[int] = None):
+    """
+    Session on a healthy read replica when configured, otherwise (or right
+    after the user wrote something) on the primary.
+    """
+    replica = await replica_router.pick(user_id)
+
+    if replica is not None:
+        session = SessionLocal(bind=replica.engine)
+        try:
+            await session.connection()
+        except DBAPIError as e:
+            logger.warning(f"Read replica unavailable, falling back to primary: {e}")
+            replica.mark_unhealthy()
+            await session.close()
+        else:
+            async with session:
+                yield session
+            return
+
+    async with SessionLocal() as session:
+        yield session
+
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers, see read_session."""
+    async with read_session(_token_subject(request)) as session:
+        yield session
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_user_write(session: Session):
+    user_id = session.info.get("user_id")
+    if user_id is not None:
+        # Runs inside AsyncSession.commit's greenlet, so the write is recorded before commit returns
+        await_only(replica_router.record_write(user_id))
+
+
 # def create_tables():
 #     Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,267 @@
+"""
+Dry run of pending migrations: renders their SQL offline (nothing is
+executed) and estimates, per statement, which lock it takes on which table,
+what that lock blocks, whether the table is scanned or rewritten and, with
+the table sizes of a local copy of the database, for how long. Locks taken
+inside a transaction are held until its COMMIT, so their estimate covers the
+rest of the transaction. Used by `python -m scripts.migrate --dry-run`.
+
+The throughput figures are rough, the estimate is meant to tell "instant"
+from "minutes", run the migration against the copy for real numbers.
+"""
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import psycopg
+from alembic import command
+
+from db.migrations import alembic_config
+from db.online_migrations import BATCHED_MARKER
+
+SCAN_MB_PER_SECOND = 200
+INDEX_BUILD_MB_PER_SECOND = 50
+REWRITE_MB_PER_SECOND = 50
+
+# What each lock mode blocks for other sessions
+LOCK_BLOCKS = {
+    "ACCESS EXCLUSIVE": "reads and writes",
+    "EXCLUSIVE": "writes",
+    "SHARE ROW EXCLUSIVE": "writes",
+    "SHARE": "writes",
+    "SHARE UPDATE EXCLUSIVE": "other DDL",
+    "ROW EXCLUSIVE": "updated rows",
+}
+WRITE_BLOCKING_LOCKS = {"ACCESS EXCLUSIVE", "EXCLUSIVE", "SHARE ROW EXCLUSIVE", "SHARE"}
+
+TABLE_SIZES_SQL = """
+SELECT c.relname, c.reltuples::bigint, pg_relation_size(c.oid), pg_total_relation_size(c.oid)
+FROM pg_class c
+WHERE c.relkind IN ('r', 'p') AND pg_table_is_visible(c.oid)
+"""
+
+NAME = r'"?([\w.]+)"?'
+VOLATILE_DEFAULT = re.compile(
+    r"\bDEFAULT\b.*\b(random|clock_timestamp|gen_random_uuid|uuid_generate_v\d|nextval)\s*\(|"
+    r"\b(BIG|SMALL)?SERIAL\b|\bGENERATED ALWAYS AS\b.*\bSTORED\b",
+    re.IGNORECASE | re.DOTALL,
+)
+NOT_NULL_CHECK = re.compile(rf"ADD CONSTRAINT {NAME} CHECK \(\s*{NAME} IS NOT NULL\s*\) NOT VALID", re.IGNORECASE)
+
+
+@dataclass
+class TableSize:
+    rows: int = 0
+    heap_bytes: int = 0
+    total_bytes: int = 0
+
+
+@dataclass
+class StatementImpact:
+    revision: str
+    sql: str
+    table: Optional[str] = None
+    lock: Optional[str] = None
+    # none, scan, build (index), rewrite, rows (DML), unknown
+    work: str = "none"
+    in_transaction: bool = False
+    batched: bool = False
+    # Created earlier in this run, nothing uses it yet
+    new_table: bool = False
+    seconds: float = 0.0
+    held_seconds: float = 0.0
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def blocks(self) -> str:
+        return LOCK_BLOCKS.get(self.lock, "nothing")
+
+    @property
+    def blocks_writes(self) -> bool:
+        return self.lock in WRITE_BLOCKING_LOCKS or (self.work == "rows" and not self.batched)
+
+
+def table_sizes(db_conn_str: str) -> Dict[str, TableSize]:
+    with psycopg.connect(db_conn_str, connect_timeout=5) as conn:
+        rows = conn.execute(TABLE_SIZES_SQL).fetchall()
+    return {name: TableSize(max(tuples, 0), heap, total) for name, tuples, heap, total in rows}
+
+
+def upgrade_sql(current: Iterable[str]) -> str:
+    """SQL that would bring a database at the given revisions to head, rendered offline."""
+    current = sorted(current)
+    if len(current) > 1:
+        raise ValueError(f"Dry run needs a single current revision, the database is at {', '.join(current)}")
+    config = alembic_config()
+    # Offline mode only needs the dialect
+    config.set_main_option("sqlalchemy.url", "postgresql+psycopg://")
+    config.output_buffer = io.StringIO()
+    command.upgrade(config, f"{current[0]}:head" if current else "head", sql=True)
+    return config.output_buffer.getvalue()
+
+
+def _statements(sql: str):
+    """(revision, batched, statement) in order, with BEGIN/COMMIT passed through."""
+    revision, batched = "", False
+    for chunk in re.split(r";\s*\n", sql):
+        lines = []
+        for line in chunk.strip().splitlines():
+            if line.startswith(BATCHED_MARKER):
+                batched = True
+            elif line.startswith("-- Running upgrade"):
+                revision = line.split("->")[-1].strip()
+            elif not line.startswith("--"):
+                lines.append(line)
+        statement = "\n".join(lines).strip().rstrip(";")
+        if statement:
+            yield revision, batched, statement
+            batched = False
+
+
+def _alter_table(impact: StatementImpact, body: str, validated_not_null: set) -> None:
+    upper = body.upper()
+    impact.lock = "ACCESS EXCLUSIVE"
+    if re.search(r"\bADD COLUMN\b", upper) or re.match(r"\s*ADD\s+(?!CONSTRAINT|FOREIGN|CHECK|UNIQUE|PRIMARY)", upper):
+        if VOLATILE_DEFAULT.search(body):
+            impact.work = "rewrite"
+            impact.notes.append("volatile default or serial/stored column, every row is rewritten")
+    elif re.search(r"\b(SET DATA )?TYPE\b", upper) and "ALTER COLUMN" in upper:
+        impact.work = "rewrite"
+        impact.notes.append("type change rewrites the table unless binary coercible (e.g. varchar to text)")
+    elif "SET NOT NULL" in upper:
+        column = re.search(rf"ALTER COLUMN {NAME} SET NOT NULL", body, re.IGNORECASE)
+        if column and (impact.table, column.group(1)) in validated_not_null:
+            impact.notes.append("proven by a validated check constraint, no scan")
+        else:
+            impact.work = "scan"
+            impact.notes.append("scans the table, use set_not_null() after a backfill")
+    elif "VALIDATE CONSTRAINT" in upper:
+        impact.lock, impact.work = "SHARE UPDATE EXCLUSIVE", "scan"
+    elif "NOT VALID" in upper:
+        if "FOREIGN KEY" in upper:
+            impact.lock = "SHARE ROW EXCLUSIVE"
+    elif "FOREIGN KEY" in upper:
+        impact.lock, impact.work = "SHARE ROW EXCLUSIVE", "scan"
+        impact.notes.append("validates every row, add it NOT VALID and VALIDATE separately")
+    elif re.search(r"\bADD\b.*\bCHECK\b", upper):
+        impact.work = "scan"
+        impact.notes.append("validates every row, add it NOT VALID and VALIDATE separately")
+    elif re.search(r"\bADD\b.*\b(UNIQUE|PRIMARY KEY)\b", upper) and "USING INDEX" not in upper:
+        impact.work = "build"
+        impact.notes.append("builds the index under the lock, create it concurrently and add USING INDEX")
+    elif not re.search(r"\b(DROP|RENAME|SET DEFAULT|DROP DEFAULT|DROP NOT NULL)\b", upper):
+        impact.work = "unknown"
+
+
+def analyze(sql: str, sizes: Dict[str, TableSize]) -> List[StatementImpact]:
+    impacts: List[StatementImpact] = []
+    transaction: List[StatementImpact] = []
+    in_transaction = False
+    validated_not_null: set = set()
+    new_tables: set = set()
+    not_null_checks: Dict[str, tuple] = {}
+
+    for revision, batched, statement in _statements(sql):
+        upper = " ".join(statement.split()).upper()
+        if upper in ("BEGIN", "START TRANSACTION"):
+            in_transaction, transaction = True, []
+            continue
+        if upper == "COMMIT":
+            # Locks are released here, every one was held for the rest of the transaction
+            for i, impact in enumerate(transaction):
+                if impact.lock is not None:
+                    impact.held_seconds = sum(later.seconds for later in transaction[i:])
+            in_transaction, transaction = False, []
+            continue
+        if re.match(r"(SET|SELECT|SHOW)\b", upper) or "ALEMBIC_VERSION" in upper:
+            continue
+
+        impact = StatementImpact(revision, statement, in_transaction=in_transaction, batched=batched)
+        if match := re.match(rf"CREATE (UNIQUE )?INDEX (CONCURRENTLY )?(IF NOT EXISTS )?{NAME} ON (ONLY )?{NAME}", upper):
+            impact.table = match.group(6).lower()
+            impact.lock = "SHARE UPDATE EXCLUSIVE" if match.group(2) else "SHARE"
+            impact.work = "build"
+            if not match.group(2):
+                impact.notes.append("blocks writes while it builds, use create_index_concurrently()")
+        elif match := re.match(rf"DROP INDEX (CONCURRENTLY )?(IF EXISTS )?{NAME}", upper):
+            impact.lock = "SHARE UPDATE EXCLUSIVE" if match.group(1) else "ACCESS EXCLUSIVE"
+        elif match := re.match(rf"ALTER TABLE (IF EXISTS )?(ONLY )?{NAME}\s+(.*)", statement, re.IGNORECASE | re.DOTALL):
+            impact.table = match.group(3).lower()
+            body = match.group(4)
+            if check := NOT_NULL_CHECK.search(body):
+                not_null_checks[check.group(1).lower()] = (impact.table, check.group(2))
+            if validate := re.search(rf"VALIDATE CONSTRAINT {NAME}", body, re.IGNORECASE):
+                if validate.group(1).lower() in not_null_checks:
+                    validated_not_null.add(not_null_checks[validate.group(1).lower()])
+            _alter_table(impact, body, validated_not_null)
+        elif match := re.search(rf"^(?:WITH\b.*?\)\s*)?(UPDATE|DELETE FROM|INSERT INTO) {NAME}", upper, re.DOTALL):
+            impact.table = match.group(2).lower()
+            if match.group(1) != "INSERT INTO":
+                impact.lock, impact.work = "ROW EXCLUSIVE", "rows"
+                if not batched:
+                    impact.notes.append("locks every matched row until commit, use backfill_in_batches()")
+        elif match := re.match(rf"DROP TABLE (IF EXISTS )?{NAME}", upper):
+            impact.table, impact.lock = match.group(2).lower(), "ACCESS EXCLUSIVE"
+        elif match := re.match(rf"CREATE TABLE (IF NOT EXISTS )?{NAME}", upper):
+            new_tables.add(match.group(2).lower())
+        elif match := re.match(rf"(CREATE|DROP) TRIGGER (IF EXISTS )?{NAME}.*? ON {NAME}", upper):
+            impact.table = match.group(4).lower()
+            impact.lock = "SHARE ROW EXCLUSIVE" if match.group(1) == "CREATE" else "ACCESS EXCLUSIVE"
+        elif re.match(r"(CREATE|DROP) (OR REPLACE )?(TYPE|EXTENSION|SEQUENCE|FUNCTION)\b|ALTER TYPE\b|COMMENT ON\b", upper):
+            pass
+        else:
+            impact.work = "unknown"
+            impact.notes.append("not recognized, review manually")
+
+        impact.new_table = impact.table in new_tables
+        impact.seconds = _estimate_seconds(impact, sizes.get(impact.table or "", TableSize()))
+        impact.held_seconds = impact.seconds
+        impacts.append(impact)
+        if in_transaction:
+            transaction.append(impact)
+    return impacts
+
+
+def _estimate_seconds(impact: StatementImpact, size: TableSize) -> float:
+    mb = 1024 * 1024
+    if impact.work == "scan":
+        return size.heap_bytes / mb / SCAN_MB_PER_SECOND
+    if impact.work == "build":
+        return size.heap_bytes / mb / INDEX_BUILD_MB_PER_SECOND
+    if impact.work == "rewrite":
+        return size.total_bytes / mb / REWRITE_MB_PER_SECOND
+    if impact.work == "rows":
+        # A batched backfill's batches are short, the total is spread out
+        return 0.0 if impact.batched else size.heap_bytes / mb / REWRITE_MB_PER_SECOND
+    return 0.0
+
+
+def dangerous(impact: StatementImpact, max_blocking_seconds: float) -> bool:
+    """Blocks writes (or worse) on a table in use for longer than max_blocking_seconds, or can't be judged."""
+    if impact.work == "unknown":
+        return True
+    return impact.blocks_writes and not impact.new_table and impact.held_seconds > max_blocking_seconds
+
+
+def format_report(impacts: List[StatementImpact], sizes: Dict[str, TableSize], max_blocking_seconds: float) -> str:
+    if not impacts:
+        return "Nothing to migrate."
+    lines = []
+    for impact in impacts:
+        size = sizes.get(impact.table or "")
+        table = impact.table or "-"
+        if impact.new_table:
+            table += " (new)"
+        elif size is not None:
+            table += f" ({size.rows} rows, {size.total_bytes / 1024 / 1024:.1f} MB)"
+        flag = "DANGER" if dangerous(impact, max_blocking_seconds) else "ok"
+        summary = " ".join(impact.sql.split())
+        lines.append(f"[{flag}] {impact.revision}: {summary[:100]}{'...' if len(summary) > 100 else ''}")
+        lines.append(
+            f"    table {table}, lock {impact.lock or 'none'} (blocks {impact.blocks}), "
+            f"{impact.work}{' in batches' if impact.batched else ''}, "
+            f"~{impact.held_seconds:.1f}s{' until commit' if impact.in_transaction and impact.lock else ''}"
+        )
+        lines.extend(f"    {note}" for note in impact.notes)
+    return "\n".join(lines)
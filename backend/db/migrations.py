@@ -0,0 +1,41 @@
+"""Where the database stands against the Alembic head, for scripts.migrate and the readiness check."""
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+CURRENT_REVISIONS_SQL = "SELECT version_num FROM alembic_version"
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+@lru_cache(maxsize=1)
+def script_directory() -> ScriptDirectory:
+    return ScriptDirectory.from_config(alembic_config())
+
+
+def head_revisions() -> set[str]:
+    return set(script_directory().get_heads())
+
+
+def migration_state(current: Iterable[str]) -> str:
+    """
+    "current" at head, "behind" when this release's migrations still have to
+    run, "ahead" when a newer release already migrated the database (its
+    revisions are unknown here), which is fine for a rolling deploy.
+    """
+    current = set(current)
+    if current == head_revisions():
+        return "current"
+    for revision in current:
+        try:
+            script_directory().get_revision(revision)
+        except CommandError:
+            return "ahead"
+    return "behind"
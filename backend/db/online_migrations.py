@@ -0,0 +1,196 @@
+"""
+Helpers for migrations that run while the application keeps serving, see
+alembic/README for the conventions they implement. Migrations use them in
+place of the plain op calls on tables with real traffic:
+
+    from db.online_migrations import backfill_in_batches, create_index_concurrently, set_not_null
+
+Each helper commits its own steps (Alembic's autocommit_block), so the
+strong lock of one step is never held while the next one scans the table.
+In offline mode (`alembic upgrade --sql`, the dry run of scripts.migrate)
+they emit the SQL of one pass, batched backfills marked with a comment.
+"""
+import logging
+import time
+from typing import Optional, Sequence
+
+from alembic import context, op
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Marks a statement the dry run shouldn't treat as one big UPDATE
+BATCHED_MARKER = "-- online_migrations: batched"
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    **kw,
+) -> None:
+    """
+    CREATE INDEX CONCURRENTLY, which doesn't block writes. A failed or
+    cancelled concurrent build leaves an INVALID index behind, that one is
+    dropped first so the migration can simply be rerun. An existing valid
+    index is kept.
+    """
+    with op.get_context().autocommit_block():
+        if not context.is_offline_mode():
+            valid = op.get_bind().execute(
+                text(
+                    "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+                ),
+                {"name": index_name},
+            ).scalar()
+            if valid:
+                logger.info(f"Index {index_name} already exists, skipping")
+                return
+            if valid is not None:
+                logger.warning(f"Dropping invalid index {index_name} left by an earlier build")
+                op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        op.create_index(index_name, table_name, columns, unique=unique, postgresql_concurrently=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def set_not_null(table_name: str, column_name: str) -> None:
+    """
+    SET NOT NULL without scanning the table under an ACCESS EXCLUSIVE lock:
+    a NOT VALID check constraint is validated first (scans, but lets writes
+    through), SET NOT NULL then uses it instead of a scan. Backfill first.
+    A check constraint left by a failed run is reused, so it can be rerun.
+    """
+    constraint = f"ck_{table_name}_{column_name}_not_null"
+    with op.get_context().autocommit_block():
+        exists = False
+        if not context.is_offline_mode():
+            exists = op.get_bind().execute(
+                text(
+                    "SELECT 1 FROM pg_constraint "
+                    "WHERE conname = :name AND conrelid = CAST(:table AS regclass)"
+                ),
+                {"name": constraint, "table": table_name},
+            ).scalar() is not None
+        if exists:
+            logger.warning(f"Reusing check constraint {constraint} left by an earlier run")
+        else:
+            op.execute(
+                f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint} CHECK ({column_name} IS NOT NULL) NOT VALID"
+            )
+        op.execute(f"ALTER TABLE {table_name} VALIDATE CONSTRAINT {constraint}")
+        op.execute(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint}")
+
+
+def validate_constraint(table_name: str, constraint_name: str) -> None:
+    """
+    VALIDATE CONSTRAINT of a foreign key or check added NOT VALID, in a
+    transaction of its own. It scans the table under a SHARE UPDATE
+    EXCLUSIVE lock, which lets reads and writes through, while the lock the
+    NOT VALID constraint took has been released with the migration's commit.
+    """
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE {table_name} VALIDATE CONSTRAINT {constraint_name}")
+
+
+def backfill_in_batches(
+    table_name: str,
+    set_clause: str,
+    where: str,
+    batch_size: int = 1000,
+    throttle: float = 1.0,
+    pause_seconds: float = 0.05,
+    key: str = "id",
+) -> int:
+    """
+    UPDATE table SET set_clause WHERE where, batch_size rows at a time in
+    order of the integer key, each batch its own transaction so row locks
+    are short and autovacuum keeps up. After each batch it sleeps throttle
+    times as long as the batch took (at least pause_seconds), i.e. at most
+    half the time busy by default. `where` should exclude rows already done,
+    e.g. `updated_at IS NULL`, so an interrupted backfill can be rerun.
+    Returns the number of rows updated.
+    """
+    statement = text(
+        f"WITH batch AS ("
+        f"SELECT {key} FROM {table_name} WHERE {key} > :after AND ({where}) "
+        f"ORDER BY {key} LIMIT :batch_size FOR UPDATE"
+        f") "
+        f"UPDATE {table_name} SET {set_clause} FROM batch WHERE {table_name}.{key} = batch.{key} "
+        f"RETURNING {table_name}.{key}"
+    )
+    if context.is_offline_mode():
+        with op.get_context().autocommit_block():
+            op.execute(f"{BATCHED_MARKER} {table_name}, {batch_size} rows per batch")
+            op.execute(statement.bindparams(after=0, batch_size=batch_size))
+        return 0
+
+    total = 0
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        after = conn.execute(text(f"SELECT min({key}) - 1 FROM {table_name}")).scalar()
+        while after is not None:
+            start = time.monotonic()
+            keys = _retry_on_lock_timeout(
+                lambda: conn.execute(statement, {"after": after, "batch_size": batch_size}).scalars().all()
+            )
+            if not keys:
+                break
+            after = max(keys)
+            total += len(keys)
+            elapsed = time.monotonic() - start
+            logger.info(f"Backfilled {total} rows of {table_name} (up to {key} {after}, batch took {elapsed:.2f}s)")
+            time.sleep(max(pause_seconds, elapsed * throttle))
+    return total
+
+
+def with_lock_retries(statements: str | Sequence[str], attempts: int = 5, lock_timeout: Optional[str] = None) -> None:
+    """
+    Runs DDL that needs a short ACCESS EXCLUSIVE lock (ADD COLUMN, DROP
+    COLUMN, ...) in a savepoint, retried with backoff when it gives up
+    waiting for the lock after lock_timeout (MIGRATION_LOCK_TIMEOUT by
+    default). Giving up beats queueing behind a long transaction, which
+    blocks every query on the table that arrives after the DDL.
+    """
+    if isinstance(statements, str):
+        statements = [statements]
+    if context.is_offline_mode():
+        for statement in statements:
+            op.execute(statement)
+        return
+
+    conn = op.get_bind()
+
+    def attempt():
+        with conn.begin_nested():
+            previous = None
+            if lock_timeout:
+                previous = conn.execute(text("SELECT current_setting('lock_timeout')")).scalar()
+                conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": lock_timeout})
+            for statement in statements:
+                conn.execute(text(statement))
+            # Released savepoints keep local settings until the migration's transaction ends
+            if previous is not None:
+                conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": previous})
+
+    _retry_on_lock_timeout(attempt, attempts)
+
+
+def _retry_on_lock_timeout(run, attempts: int = 5):
+    for attempt in range(1, attempts + 1):
+        try:
+            return run()
+        except OperationalError as e:
+            if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"Lock timeout (attempt {attempt}/{attempts}), retrying in {delay} seconds")
+            time.sleep(delay)
@@ -0,0 +1,138 @@
+"""
+Hot statements shared by the services and routers.
+
+They are built with lambda_stmt, so SQLAlchemy constructs and compiles each one
+once per process and afterwards only extracts the bound parameters from the
+lambda closure. Benchmark: python -m scripts.bench_queries
+"""
+import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select, lambda_stmt, func, or_
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from models.tasks import Task, TaskPriority, ArchivedTask
+from models.users import User
+
+
+def _load_only(stmt: StatementLambdaElement, model, columns: Sequence[str]) -> StatementLambdaElement:
+    """Narrow the SELECT to the given columns, other attributes raise instead of lazy loading."""
+    attributes = tuple(getattr(model, column) for column in columns)
+    return stmt.add_criteria(
+        lambda s: s.options(load_only(*attributes, raiseload=True)),
+        track_on=[attributes],
+    )
+
+
+def user_by_id(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def user_picture(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User.picture).where(User.id == user_id))
+
+
+def user_by_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.email == email))
+
+
+def user_by_google_id(google_id: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.google_id == google_id))
+
+
+def task_by_id(task_id: int, columns: Optional[Sequence[str]] = None) -> StatementLambdaElement:
+    stmt = lambda_stmt(lambda: select(Task).where(Task.id == task_id))
+    return _load_only(stmt, Task, columns) if columns else stmt
+
+
+def tasks_by_user(
+        user_id: int,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        priorities: Optional[List[TaskPriority]] = None,
+        sort: str = "created",
+        columns: Optional[Sequence[str]] = None,
+) -> StatementLambdaElement:
+    """
+    Tasks of a user, newest first unless sorted by priority or due date. A single
+    start_date selects one day, start and end dates select a range, without dates
+    only the latest open tasks are returned. Recurring series are left out of date
+    ranges, their occurrences are expanded from recurring_tasks_in_range instead.
+    With columns, only those are selected.
+    """
+    stmt = lambda_stmt(lambda: select(Task).where(Task.user_id == user_id))
+
+    if priorities:
+        stmt += lambda s: s.where(Task.priority.in_(priorities))
+
+    if start_date and not end_date:
+        stmt += lambda s: s.where(func.date(Task.due_date) == start_date, Task.recurrence_rule.is_(None))
+    elif start_date and end_date:
+        stmt += lambda s: s.where(
+            Task.recurrence_rule.is_(None),
+            func.date(Task.due_date) >= start_date,
+            func.date(Task.due_date) <= end_date
+        )
+
+    if sort == "priority":
+        stmt += lambda s: s.order_by(Task.priority.desc(), Task.due_date, Task.id.desc())
+    elif sort == "due_date":
+        stmt += lambda s: s.order_by(Task.due_date, Task.id.desc())
+    else:
+        stmt += lambda s: s.order_by(Task.id.desc())
+
+    if not start_date and not end_date:
+        stmt += lambda s: s.where(Task.completed == False).limit(10)
+
+    if columns:
+        stmt = _load_only(stmt, Task, columns)
+
+    return stmt
+
+
+def recurring_tasks_in_range(
+        user_id: int,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        priorities: Optional[List[TaskPriority]] = None,
+) -> StatementLambdaElement:
+    """Open series of a user with an unmaterialized occurrence that may fall within [start, end)."""
+    stmt = lambda_stmt(lambda: select(Task).where(
+        Task.user_id == user_id,
+        Task.recurrence_rule.is_not(None),
+        Task.next_occurrence < end,
+        or_(Task.recurrence_end.is_(None), Task.recurrence_end >= start),
+    ))
+
+    if priorities:
+        stmt += lambda s: s.where(Task.priority.in_(priorities))
+
+    return stmt
+
+
+def archived_tasks_by_user(
+        user_id: int,
+        start_date: datetime.date,
+        end_date: Optional[datetime.date] = None,
+        priorities: Optional[List[TaskPriority]] = None,
+        columns: Optional[Sequence[str]] = None,
+) -> StatementLambdaElement:
+    """Archived tasks of a user due within the date range, same semantics as tasks_by_user."""
+    stmt = lambda_stmt(lambda: select(ArchivedTask).where(ArchivedTask.user_id == user_id))
+
+    if end_date:
+        stmt += lambda s: s.where(
+            func.date(ArchivedTask.due_date) >= start_date,
+            func.date(ArchivedTask.due_date) <= end_date
+        )
+    else:
+        stmt += lambda s: s.where(func.date(ArchivedTask.due_date) == start_date)
+
+    if priorities:
+        stmt += lambda s: s.where(ArchivedTask.priority.in_(priorities))
+
+    if columns:
+        stmt = _load_only(stmt, ArchivedTask, columns)
+
+    return stmt
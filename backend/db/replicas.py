@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_TIMEOUT_SECONDS = 2
+RECENT_WRITERS_NAMESPACE = "recent_writers"
+
+
+class Replica:
+    """A read replica engine with a cached health state."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at: float = 0
+        self._lock = asyncio.Lock()
+
+    async def is_healthy(self, check_interval: int) -> bool:
+        if time.monotonic() - self.checked_at < check_interval:
+            return self.healthy
+
+        # Only one coroutine probes the replica, the rest reuse its result
+        async with self._lock:
+            if time.monotonic() - self.checked_at < check_interval:
+                return self.healthy
+            try:
+                async with self.engine.connect() as conn:
+                    await asyncio.wait_for(conn.execute(text("SELECT 1")), HEALTH_CHECK_TIMEOUT_SECONDS)
+                self.healthy = True
+            except Exception as e:
+                if self.healthy:
+                    logger.warning(f"Read replica {self.engine.url.host} marked unhealthy: {e}")
+                self.healthy = False
+            self.checked_at = time.monotonic()
+        return self.healthy
+
+    def mark_unhealthy(self) -> None:
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """
+    Picks a read replica in round-robin order, skipping replicas that failed
+    their last health check. Users who wrote recently are kept on the primary
+    for a short window so they always read their own writes. The writers are
+    kept in the cache, with CACHE_BACKEND=redis a write seen by one worker
+    keeps the user's next read on the primary whichever worker serves it.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], check_interval: int, sticky_window: int, cache: Cache):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self.sticky_window = sticky_window
+        self.cache = cache
+        self._cycle = itertools.count()
+
+    async def record_write(self, user_id: int) -> None:
+        if self.replicas:
+            await self.cache.set(RECENT_WRITERS_NAMESPACE, user_id, True, ttl=self.sticky_window)
+
+    async def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        return await self.cache.get(RECENT_WRITERS_NAMESPACE, user_id) is not None
+
+    async def pick(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """Return a healthy replica, or None when the primary should be used."""
+        if not self.replicas or await self.is_sticky(user_id):
+            return None
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cycle) % len(self.replicas)]
+            if await replica.is_healthy(self.check_interval):
+                return replica
+        return None
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -4,14 +4,21 @@ set -e
 # Configurable defaults
 WORKERS=${GUNICORN_WORKERS:-$((2 * $(nproc)))}
 
-echo "----- Waiting for database to be ready -----"
-python -m scripts.wait-for-db
+# Other processes from the same image, e.g. the reminder scheduler, start
+# once the backend container has migrated the database
+if [ "$#" -gt 0 ]; then
+  echo "----- Waiting for database migrations -----"
+  python -m scripts.migrate --wait
+  exec "$@"
+fi
 
 echo "----- Applying database migrations -----"
-alembic upgrade head
+python -m scripts.migrate
 
 echo "----- Starting Gunicorn with $WORKERS workers -----"
 exec gunicorn -k uvicorn.workers.UvicornWorker \
+  --config=gunicorn.conf.py \
+  --preload \
   --workers="$WORKERS" \
   --bind=0.0.0.0:8000 \
   --forwarded-allow-ips='*' \
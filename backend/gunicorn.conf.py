@@ -0,0 +1,24 @@
+# Loaded by gunicorn from the working directory (see entrypoint.sh).
+
+
+def post_fork(server, worker):
+    """
+    With --preload the app, and with it the SQLAlchemy engines, is imported once
+    in the master. Drop the inherited pools without closing the parent's
+    connections, so each worker opens its own connections after the fork.
+    """
+    from db.database import engine, replica_router
+
+    engine.sync_engine.dispose(close=False)
+    for replica in replica_router.replicas:
+        replica.engine.sync_engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    """
+    The uvicorn worker points uvicorn's loggers at gunicorn's handlers, send
+    them through the app's logging pipeline instead (JSON, request ids).
+    """
+    from core.log import setup_logging
+
+    setup_logging()
@@ -1,16 +1,37 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from admin import UserAdmin
-from admin_panel_auth import authentication_backend
-from db.database import engine
+from core.cache import cache
+from core.compression import CompressionMiddleware
 from core.config import settings
-from routers import users, auth, health, admin_users
+from core.idempotency import IdempotencyMiddleware
+from core.log import RequestIdMiddleware, setup_logging
+from routers import users, auth, health, admin_users, admin_cache, admin_rate_limits, admin_profiles
 from routers import tasks
-from sqladmin import Admin
+from services.last_login_buffer import last_login_buffer
+from services.task_events import task_event_hub
+from services.token_revocations import require_shared_cache, revocation_list
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    require_shared_cache()
+    last_login_buffer.start()
+    revocation_list.start()
+    yield
+    await revocation_list.stop()
+    await task_event_hub.stop()
+    await last_login_buffer.stop()
+    await cache.close()
+
 
 app = FastAPI(
     title="Tasks App",
@@ -18,22 +39,72 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 current_path = os.path.dirname(os.path.abspath(__file__))
 
-admin = Admin(
-    app,
-    engine,
-    base_url="/admin-portal",
-    authentication_backend=authentication_backend,
-    templates_dir=os.path.join(current_path, "templates/sqladmin")
-)
 
-admin.add_view(UserAdmin)
+class LazyAdminApp:
+    """
+    Builds the sqladmin panel on its first request, so sqladmin and its
+    templates are not imported by every worker at startup.
+    """
+
+    def __init__(self):
+        self._app = None
+
+    def _build(self):
+        from starlette.applications import Starlette
+        from sqladmin import Admin
+
+        from admin import UserAdmin
+        from admin_panel_auth import authentication_backend
+        from db.database import engine
+
+        # sqladmin mounts itself on the given app, only its inner app is used
+        admin = Admin(
+            Starlette(),
+            engine,
+            base_url="/admin-portal",
+            authentication_backend=authentication_backend,
+            templates_dir=os.path.join(current_path, "templates/sqladmin")
+        )
+        admin.add_view(UserAdmin)
+        return admin.admin
+
+    @property
+    def routes(self):
+        # Needed by url_for("admin:...") lookups through the parent router
+        if self._app is None:
+            self._app = self._build()
+        return self._app.routes
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            self._app = self._build()
+        await self._app(scope, receive, send)
+
+
+app.mount("/admin-portal", LazyAdminApp(), name="admin")
+
+# Retries of task writes carrying an Idempotency-Key replay the first response
+app.add_middleware(IdempotencyMiddleware, path_prefix=f"{settings.API_PREFIX}/tasks")
+
+# Only installed when enabled, profiling costs nothing otherwise
+if settings.PROFILING_ON_DEMAND or settings.PROFILING_SAMPLE_RATE > 0:
+    from core.profiling import ProfilingMiddleware
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        on_demand=settings.PROFILING_ON_DEMAND,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL_SECONDS,
+        output_dir=settings.PROFILING_OUTPUT_DIR,
+    )
 
 if settings.ENVIRONMENT == "development" or settings.ENVIRONMENT == "local":
-    print("Running in development mode, enabling CORS for web testing.")
+    logger.info("Running in development mode, enabling CORS for web testing.")
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.ALLOWED_ORIGINS,
@@ -51,12 +122,27 @@ app.add_middleware(
     path="/admin-portal"
 )
 
+# Outermost, so replayed idempotent responses are compressed like fresh ones
+if settings.COMPRESSION_ENCODINGS:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels={"gzip": settings.COMPRESSION_GZIP_LEVEL},
+    )
+
+# Outermost, every log record of a request, including the access log, carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(health.router, prefix=settings.API_PREFIX)
 app.include_router(auth.router, prefix=settings.API_PREFIX)
 app.include_router(users.router, prefix=settings.API_PREFIX)
 app.include_router(tasks.router, prefix=settings.API_PREFIX)
 app.include_router(admin_users.router, prefix=settings.API_PREFIX)
+app.include_router(admin_cache.router, prefix=settings.API_PREFIX)
+app.include_router(admin_rate_limits.router, prefix=settings.API_PREFIX)
+app.include_router(admin_profiles.router, prefix=settings.API_PREFIX)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,21 +1,98 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+import enum
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Enum, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.functions import func
 from db.database import Base
 
 
+class TaskPriority(str, enum.Enum):
+    # Declaration order is the sort order of the Postgres enum
+    low = "low"
+    medium = "medium"
+    high = "high"
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String, nullable=False)
     description = Column(String)
     due_date = Column(DateTime(timezone=True), nullable=False)
-    priority = Column(String, nullable=False)
+    priority = Column(Enum(TaskPriority, name="task_priority"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     completed = Column(Boolean, default=False)
     notification_id = Column(String, nullable=True)
+    reminded_at = Column(DateTime(timezone=True), nullable=True)
+    # Recurring series: due_date is the first occurrence, next_occurrence the
+    # earliest one not materialized yet (None once the series has ended)
+    recurrence_rule = Column(String, nullable=True)
+    recurrence_end = Column(DateTime(timezone=True), nullable=True)
+    next_occurrence = Column(DateTime(timezone=True), nullable=True)
+    # Materialized occurrence: a completed or edited occurrence of a series
+    recurrence_parent_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True)
+    occurrence_date = Column(DateTime(timezone=True), nullable=True)
 
     user = relationship("User", back_populates="tasks")
+
+    __table_args__ = (
+        # Range scans of the reminder scheduler over open, not yet reminded tasks
+        Index(
+            "ix_tasks_due_date_pending_reminder",
+            "due_date",
+            postgresql_where=text("completed = false AND reminded_at IS NULL"),
+        ),
+        # Priority views, e.g. the upcoming high-priority tasks of a user
+        Index("ix_tasks_user_priority_due_date", "user_id", "priority", "due_date"),
+        # Series of a user with an occurrence before the end of a date window
+        Index(
+            "ix_tasks_user_next_occurrence_recurring",
+            "user_id",
+            "next_occurrence",
+            postgresql_where=text("recurrence_rule IS NOT NULL"),
+        ),
+        # Completed tasks the archive mover picks up
+        Index(
+            "ix_tasks_completed_at_archivable",
+            "completed_at",
+            postgresql_where=text("completed = true AND recurrence_rule IS NULL"),
+        ),
+        # One row per materialized occurrence, also backs the cascade from the series
+        Index("uq_tasks_recurrence_parent_occurrence", "recurrence_parent_id", "occurrence_date", unique=True),
+    )
+
+
+class ArchivedTask(Base):
+    """
+    Completed tasks moved out of `tasks` by services.task_archive, read-only.
+    Every row is due before the archive cutoff, so reads only need this table
+    for date ranges starting before it.
+    """
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    due_date = Column(DateTime(timezone=True), nullable=False)
+    priority = Column(Enum(TaskPriority, name="task_priority"), nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    completed = Column(Boolean, default=True)
+    notification_id = Column(String, nullable=True)
+    recurrence_parent_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True)
+    occurrence_date = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_tasks_archive_user_due_date", "user_id", "due_date"),
+        Index(
+            "ix_tasks_archive_recurrence_parent_occurrence",
+            "recurrence_parent_id",
+            "occurrence_date",
+            postgresql_where=text("recurrence_parent_id IS NOT NULL"),
+        ),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql.functions import func
+from db.database import Base
+
+
+class TokenRevocation(Base):
+    """
+    Revoked refresh token families, kept until the family would have expired
+    anyway. Used refresh tokens are tracked in the shared cache instead.
+    """
+    __tablename__ = "token_revocations"
+
+    family_id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Incremental sync of revoked families into each worker's denylist
+        Index("ix_token_revocations_revoked_at", "revoked_at"),
+        Index("ix_token_revocations_expires_at", "expires_at"),
+    )
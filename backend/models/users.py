@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.dialects.mysql import VARCHAR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.functions import func
@@ -20,8 +20,14 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     auth_provider = Column(String, nullable=True)
 
+    __table_args__ = (
+        # Serves the admin panel's ILIKE '%term%' email search
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
     tasks = relationship(
         "Task",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+
+from core.cache import cache
+from core.security import verify_admin
+
+router = APIRouter(prefix="/admin/cache", tags=["admin-cache"])
+
+
+@router.get("/stats")
+async def cache_stats(_: str = Depends(verify_admin)):
+    """Hit and miss counts per namespace of the worker that serves the request."""
+    return cache.stats()
+
+
+@router.delete("/{namespace}")
+async def invalidate_cache_namespace(namespace: str, _: str = Depends(verify_admin)):
+    await cache.invalidate(namespace)
+    return {"message": f"Cache namespace {namespace} invalidated"}
@@ -0,0 +1,33 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from core.profiling import route_profiles, profile_response
+from core.security import verify_admin
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin-profiles"])
+
+
+@router.get("")
+async def list_route_profiles(_: str = Depends(verify_admin)):
+    """Routes with sampled profiles (PROFILING_SAMPLE_RATE) on the worker that serves the request."""
+    return {"routes": route_profiles.summary()}
+
+
+@router.get("/report")
+async def route_profile_report(
+        route: str,
+        format: Literal["speedscope", "html", "text"] = "speedscope",
+        _: str = Depends(verify_admin),
+):
+    """Combined profile of a route's samples, route as listed, e.g. `GET /tasks/get/{task_id}`."""
+    session = route_profiles.get(route)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No samples for this route")
+    return profile_response(session, format, "profile")
+
+
+@router.delete("")
+async def clear_route_profiles(_: str = Depends(verify_admin)):
+    route_profiles.clear()
+    return {"message": "Sampled profiles cleared"}
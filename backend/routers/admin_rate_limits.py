@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+
+from core.rate_limit import rate_limiter
+from core.security import verify_admin
+
+router = APIRouter(prefix="/admin/rate-limits", tags=["admin-rate-limits"])
+
+
+@router.get("/stats")
+async def rate_limit_stats(_: str = Depends(verify_admin)):
+    """Rejected requests per scope and limit kind, counted by the worker that serves the request."""
+    return {"rejections": rate_limiter.stats()}
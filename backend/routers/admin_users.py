@@ -1,22 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse
 from core.security import get_password_hash, verify_admin
-from db.database import get_db
+from db.database import get_db, get_read_db, read_session
 from models.users import User
-from schemas.users import UserCreate, UserResponse, AdminUserUpdate
+from schemas.users import UserCreate, UserResponse, AdminUserUpdate, AdminUserListItem, AdminUserPage
+from sqlalchemy import delete
 from sqlalchemy.future import select
-from services.user_service import get_user_by_email, create_user
+from services.user_service import get_user_by_email, create_user, invalidate_cached_user
 
 router = APIRouter(prefix="/admin/users", tags=["admin-users"])
 
+# Listing columns, the base64 picture is deliberately left out
+ADMIN_LIST_COLUMNS = (
+    User.id,
+    User.email,
+    User.full_name,
+    User.is_verified,
+    User.is_active,
+    User.auth_provider,
+    User.created_at,
+    User.last_login,
+)
+EXPORT_BATCH_SIZE = 1000
+
+
+def admin_user_filters(
+        is_active: Optional[bool] = None,
+        auth_provider: Optional[str] = None,
+        created_from: Optional[datetime.datetime] = None,
+        created_to: Optional[datetime.datetime] = None,
+) -> list:
+    conditions = []
+    if is_active is not None:
+        conditions.append(User.is_active == is_active)
+    if auth_provider:
+        conditions.append(User.auth_provider == auth_provider)
+    if created_from:
+        conditions.append(User.created_at >= created_from)
+    if created_to:
+        conditions.append(User.created_at < created_to)
+    return conditions
+
 
-@router.get("", response_model=list[UserResponse])
+@router.get("", response_model=AdminUserPage)
 async def get_all_users(
-        db: AsyncSession = Depends(get_db),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+        filters: list = Depends(admin_user_filters),
+        db: AsyncSession = Depends(get_read_db),
+        _: str = Depends(verify_admin),
+):
+    """
+    List users ordered by id, one page at a time.
+    Pass the returned next_cursor to get the following page, it is null on the last one.
+    """
+    query = select(*ADMIN_LIST_COLUMNS).where(*filters).order_by(User.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": rows,
+        "next_cursor": rows[-1].id if has_more else None,
+    }
+
+
+@router.get("/export")
+async def export_users(
+        filters: list = Depends(admin_user_filters),
         _: str = Depends(verify_admin),
 ):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+    """Stream all matching users as newline-delimited JSON, for bulk admin tooling."""
+    query = select(*ADMIN_LIST_COLUMNS).where(*filters).order_by(User.id)
+
+    async def generate_rows():
+        # Own session, it has to stay open for as long as the response streams
+        async with read_session() as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for partition in result.partitions():
+                yield "".join(
+                    AdminUserListItem.model_validate(row).model_dump_json() + "\n" for row in partition
+                )
+
+    return StreamingResponse(generate_rows(), media_type="application/x-ndjson")
 
 
 @router.post("/create", response_model=UserResponse)
@@ -54,19 +127,21 @@ async def update_user_status(
 
     db.add(user)
     await db.commit()
+    await invalidate_cached_user(user_id)
     await db.refresh(user)
     return {"message": "User updated"}
 
 
 @router.delete("/{user_id}")
 async def delete_user_admin(
-        user_id: str,
+        user_id: int,
         db: AsyncSession = Depends(get_db),
         _: str = Depends(verify_admin),
 ):
-    user = await db.get(User, user_id)
-    if not user:
+    # Tasks are removed by the ON DELETE CASCADE foreign key, nothing is loaded
+    result = await db.execute(delete(User).where(User.id == user_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="User not found")
-    await db.delete(user)
     await db.commit()
+    await invalidate_cached_user(user_id)
     return {"message": "User deleted"}
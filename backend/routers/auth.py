@@ -1,11 +1,11 @@
+import datetime
+import logging
 import time
 import urllib.parse
 
-import httpx
 from fastapi import APIRouter, Depends, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.exceptions import HTTPException
@@ -13,8 +13,17 @@ from starlette.responses import RedirectResponse
 from db.database import get_db
 from core.config import settings
 from models.users import User
-from services.user_service import get_user_by_google_id, create_oauth_user, update_last_login
-from core.security import create_access_token, create_refresh_token, validate_token, verify_google_id_token
+from services.user_service import get_user_by_google_id, create_oauth_user, update_last_login, get_cached_user
+from core.security import (
+    create_access_token,
+    create_refresh_token,
+    new_token_family,
+    validate_token,
+    verify_google_id_token,
+)
+from services.token_revocations import revocation_list, revoke_family, token_family, use_refresh_token
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -47,7 +56,10 @@ async def refresh_token_route(
         credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
         db: AsyncSession = Depends(get_db)
 ):
-    """Refresh tokens using ONLY a valid refresh token."""
+    """
+    Refresh tokens using ONLY a valid refresh token. The refresh token is
+    rotated on every use, presenting a used one again revokes its whole family.
+    """
     refresh_token = credentials.credentials
 
     try:
@@ -64,7 +76,12 @@ async def refresh_token_route(
                 detail="Only refresh tokens can be used here"
             )
 
-        # 2. Validate user
+        # 2. Revoked families are rejected from memory, without a query
+        family_id = token_family(payload)
+        if revocation_list.is_revoked(family_id):
+            raise JWTError("Token revoked")
+
+        # 3. Validate user, from the principal cache
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(
@@ -72,9 +89,7 @@ async def refresh_token_route(
                 detail="Invalid token payload"
             )
 
-        query = select(User).where(User.id == int(user_id))
-        result = await db.execute(query)
-        user = result.scalars().first()
+        user = await get_cached_user(db, int(user_id))
 
         if not user:
             raise HTTPException(
@@ -88,20 +103,24 @@ async def refresh_token_route(
                 detail="User account is inactive"
             )
 
-        new_access_token = create_access_token(data={"sub": str(user.id)})
-        remaining_life = payload["exp"] - int(time.time())
+        # 4. Rotate, a second use of the same token means it leaked
+        used_at = await use_refresh_token(payload)
+        if used_at is not None:
+            # Concurrent refreshes of one client are not treated as reuse
+            grace = datetime.timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+            if datetime.datetime.now(datetime.UTC) - used_at > grace:
+                logger.warning(f"Refresh token reuse detected for user {user.id}, revoking its token family", extra={"user_id": user.id})
+                await revoke_family(db, family_id, user.id)
+            raise JWTError("Refresh token already used")
 
-        if remaining_life < (
-                settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400 * 0.25):
-            new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
-        else:
-            new_refresh_token = refresh_token
+        new_access_token = create_access_token(data={"sub": str(user.id), "fam": family_id})
+        new_refresh_token = create_refresh_token(data={"sub": str(user.id), "fam": family_id})
 
         return {
             "access_token": new_access_token,
             "refresh_token": new_refresh_token,
             "token_meta": {
-                "refresh_rotated": new_refresh_token is not None,
+                "refresh_rotated": True,
                 "access_expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
             }
         }
@@ -114,6 +133,23 @@ async def refresh_token_route(
         )
 
 
+@router.post("/logout")
+async def logout_route(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+        db: AsyncSession = Depends(get_db)
+):
+    """Revoke the refresh token's family, ending the session it belongs to on every device."""
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No token provided or invalid Authorization header"
+        )
+    payload = await validate_token(credentials.credentials, expected_type="refresh")
+    await revoke_family(db, token_family(payload), int(payload["sub"]))
+
+    return {"message": "Logged out"}
+
+
 @router.get("/google/login")
 async def google_login_start():
     """
@@ -151,7 +187,7 @@ async def google_auth_callback(
     try:
         jwt.decode(state, settings.STATE_SECRET_KEY, algorithms=["HS256"])
     except JWTError:
-        print("!!! Invalid state token received.")
+        logger.warning("Invalid OAuth state token received")
         return RedirectResponse(url=failure_url)
 
     token_url = "https://oauth2.googleapis.com/token"
@@ -164,6 +200,8 @@ async def google_auth_callback(
     }
 
     try:
+        import httpx
+
         async with httpx.AsyncClient() as client:
             token_response = await client.post(token_url, data=token_data)
             token_response.raise_for_status()
@@ -183,8 +221,9 @@ async def google_auth_callback(
                                            full_name=user_info.get("name"), picture=user_info.get("picture"))
 
         await update_last_login(db, user)
-        app_access_token = create_access_token(data={"sub": str(user.id)})
-        app_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+        family_id = new_token_family()
+        app_access_token = create_access_token(data={"sub": str(user.id), "fam": family_id})
+        app_refresh_token = create_refresh_token(data={"sub": str(user.id), "fam": family_id})
 
         success_url = (
             f"{settings.FRONTEND_REDIRECT_SCHEME}://login-success"
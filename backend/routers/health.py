@@ -1,8 +1,28 @@
 from fastapi import APIRouter
+from starlette.responses import JSONResponse
+
+from services.health import readiness_check
 
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
+@router.get("/health/live")
 async def health_check():
+    """Liveness, the process answers. Touches no dependencies."""
     return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness for the load balancer: database reachable through this worker's
+    pool and migrated for this release. Checked at most once per
+    HEALTH_CHECK_INTERVAL_SECONDS, also reports pool saturation.
+
+    Returns:
+    - 200: Ready
+    - 503: Not ready
+    """
+    status = await readiness_check.status()
+    return JSONResponse(status_code=200 if status["status"] == "ready" else 503, content=status)
@@ -1,15 +1,39 @@
+import asyncio
 import datetime
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from db.database import get_db
-from models.tasks import Task
-from schemas.tasks import TaskCreate, TaskResponse, TaskUpdate
+from starlette.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from db import queries
+from db.database import get_db, get_read_db
+from models.tasks import Task, TaskPriority, ArchivedTask
+from schemas.tasks import (
+    TaskCreate, TaskResponse, TaskUpdate, TaskSort,
+    TaskBulkComplete, TaskBulkReschedule, TaskBulkDelete, TaskBulkResult,
+)
 
 from models.users import User
-from services.task_services import verify_task_ownership
-from services.user_service import get_current_user
+from services.task_services import (
+    verify_task_ownership,
+    verify_task_ownership_read,
+    materialized_occurrences,
+    schedule_series,
+    occurrence_response,
+    expand_series,
+    materialize_occurrence,
+    task_sort_key,
+    task_fields,
+    task_columns,
+    sparse_task,
+    sparse_response,
+)
+from services.task_archive import archive_cutoff
+from services.task_bulk import bulk_complete, bulk_reschedule, bulk_delete
+from services.task_events import notify_task_change, task_event_hub
+from services.user_service import get_current_user, get_current_user_read
+
+STREAM_KEEPALIVE_SECONDS = 15
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -23,7 +47,11 @@ async def create_task(
     """Create a new task"""
 
     task = Task(**task.model_dump(), user_id=current_user.id)
+    if task.recurrence_rule:
+        schedule_series(task)
     db.add(task)
+    await db.flush()
+    await notify_task_change(db, current_user.id, task.id, "created")
     await db.commit()
     await db.refresh(task)
 
@@ -34,46 +62,108 @@ async def create_task(
 async def get_all_tasks(
         start_date: Optional[datetime.date] = None,
         end_date: Optional[datetime.date] = None,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        priority: Optional[List[TaskPriority]] = Query(None),
+        sort: TaskSort = TaskSort.created,
+        fields: Optional[Tuple[str, ...]] = Depends(task_fields),
+        db: AsyncSession = Depends(get_read_db),
+        current_user: User = Depends(get_current_user_read)
 ):
     """
-    Get all tasks by current user.
+    Get all tasks by current user. Recurring tasks are expanded into their
+    occurrences within the date range, or into their next occurrence without one.
+    Ranges reaching back past the archive cutoff include archived tasks.
+    `priority` (repeatable) filters by priority, `sort` orders by creation
+    (newest first), priority (highest first) or due date (soonest first).
+    `fields` returns, and selects, only the listed fields of each task.
 
     Returns:
     - 200: All tasks
     - 401: If not authenticated
     """
 
-    query = select(Task).where(Task.user_id == current_user.id)
+    result = await db.execute(
+        queries.tasks_by_user(current_user.id, start_date, end_date, priority, sort.value, task_columns(Task, fields))
+    )
+    tasks = [
+        occurrence_response(task, task.next_occurrence) if task.recurrence_rule and task.next_occurrence else task
+        for task in result.scalars().all()
+    ]
 
-    # If filters exist, apply them and skip the limit
-    if start_date and not end_date:
-        query = query.where(func.date(Task.due_date) == start_date)
-    elif start_date and end_date:
-        query = query.where(
-            func.date(Task.due_date) >= start_date,
-            func.date(Task.due_date) <= end_date
+    if start_date:
+        start = datetime.datetime.combine(start_date, datetime.time.min, datetime.UTC)
+        last_day = end_date or start_date
+        # Exclusive end, the day after the last one unless that is past the last representable date
+        end = (
+            datetime.datetime.combine(last_day + datetime.timedelta(days=1), datetime.time.min, datetime.UTC)
+            if last_day < datetime.date.max else datetime.datetime.max.replace(tzinfo=datetime.UTC)
         )
+        merged = len(tasks)
 
-    # Sort descending to get newest first
-    query = query.order_by(Task.id.desc())
+        result = await db.execute(queries.recurring_tasks_in_range(current_user.id, start, end, priority))
+        series = result.scalars().all()
+        if series:
+            materialized = await materialized_occurrences(db, [s.id for s in series], since=start, until=end)
+            for recurring in series:
+                tasks.extend(expand_series(recurring, materialized.get(recurring.id, set()), start, end))
 
-    if not start_date and not end_date:
-        query = query.where(Task.completed == False).limit(10)
+        # Archived tasks are all due before the cutoff, recent ranges skip the archive
+        if start < archive_cutoff(datetime.datetime.now(datetime.UTC)):
+            result = await db.execute(queries.archived_tasks_by_user(
+                current_user.id, start_date, end_date, priority, task_columns(ArchivedTask, fields)
+            ))
+            tasks.extend(result.scalars().all())
 
-    result = await db.execute(query)
-    tasks = result.scalars().all()
+        if len(tasks) > merged:
+            tasks.sort(key=task_sort_key(sort))
 
+    if fields:
+        return sparse_response([sparse_task(task, fields) for task in tasks])
     return tasks
 
 
+@router.get("/stream")
+async def stream_task_changes(
+        request: Request,
+        db: AsyncSession = Depends(get_read_db),
+        current_user: User = Depends(get_current_user_read)
+):
+    """
+    Server-Sent Events stream of the current user's task changes, made from any device.
+    Each event carries task_id and action (created, updated or deleted).
+    """
+    user_id = current_user.id
+    # Give the pooled connection back, the stream can stay open for hours
+    await db.close()
+
+    async def events():
+        queue = task_event_hub.subscribe(user_id)
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: task\ndata: {json.dumps(event)}\n\n"
+        finally:
+            task_event_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/get/{task_id}", response_model=TaskResponse)
 async def get_task(
-        task: Task = Depends(verify_task_ownership)
+        task: Task = Depends(verify_task_ownership_read),
+        fields: Optional[Tuple[str, ...]] = Depends(task_fields),
 ):
     """
     Get a specific task by ID if it belongs to the current user.
+    `fields` returns, and selects, only the listed fields.
 
     Returns:
     - 200: Task details
@@ -81,21 +171,39 @@ async def get_task(
     - 401: If not authenticated
     """
 
+    if fields:
+        return sparse_response(sparse_task(task, fields))
     return task
 
 
 @router.patch("/update/{task_id}", response_model=TaskResponse)
 async def update_task(
         task_update: TaskUpdate,
+        occurrence: Optional[datetime.datetime] = None,
         db: AsyncSession = Depends(get_db),
         task: Task = Depends(verify_task_ownership)
 ):
     """
     Update a specific task with full database loading and concurrency control.
+    With `occurrence`, only that occurrence of a recurring task is updated and
+    it's stored as its own task from then on. Listed occurrences carry the
+    series' id, so completing a recurring task requires `occurrence`, a
+    series is ended by clearing its `recurrence_rule`. An archived task is
+    moved back out of the archive.
     """
 
     update_data = task_update.model_dump(exclude_unset=True)
 
+    if occurrence is not None:
+        if not task.recurrence_rule:
+            raise HTTPException(status_code=400, detail="Task is not recurring")
+        update_data.pop("recurrence_rule", None)
+        task = await materialize_occurrence(db, task, occurrence)
+    elif task.recurrence_rule and "completed" in update_data and "recurrence_rule" not in update_data:
+        raise HTTPException(status_code=400, detail="Pass occurrence to complete an occurrence of a recurring task")
+    elif task.recurrence_parent_id is not None and update_data.get("recurrence_rule"):
+        raise HTTPException(status_code=400, detail="An occurrence of a recurring task can't recur itself")
+
     for key, value in update_data.items():
         setattr(task, key, value)
 
@@ -104,7 +212,17 @@ async def update_task(
     elif "completed" in update_data and not task.completed:
         task.completed_at = None
 
+    # A moved or reopened task gets a new server-side reminder
+    if "due_date" in update_data or ("completed" in update_data and not task.completed):
+        task.reminded_at = None
+
+    recurring = task.recurrence_rule or "recurrence_rule" in update_data
+    if occurrence is None and recurring and update_data.keys() & {"recurrence_rule", "due_date", "completed"}:
+        materialized = await materialized_occurrences(db, [task.id])
+        schedule_series(task, materialized.get(task.id, ()))
+
     db.add(task)
+    await notify_task_change(db, task.user_id, task.id, "updated")
     await db.commit()
     await db.refresh(task)
 
@@ -117,7 +235,7 @@ async def delete_task(
         task: Task = Depends(verify_task_ownership)
 ):
     """
-    Delete a specific task if it belongs to the current user.
+    Delete a specific task if it belongs to the current user, archived ones included.
 
     Returns:
     - 200: Task deleted successfully
@@ -126,6 +244,63 @@ async def delete_task(
     """
 
     await db.delete(task)
+    await notify_task_change(db, task.user_id, task.id, "deleted")
     await db.commit()
 
     return {"message": "Task deleted successfully"}
+
+
+@router.post("/bulk-complete", response_model=TaskBulkResult)
+async def bulk_complete_tasks(
+        bulk: TaskBulkComplete,
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Complete, or with `completed: false` reopen, every task matching the filter
+    (date range, due_before, priority, completed) in one statement.
+
+    Returns:
+    - 200: Count and ids of the changed tasks
+    - 422: If no filter is given
+    """
+
+    task_ids = await bulk_complete(db, current_user.id, bulk.filter, bulk.completed)
+    return TaskBulkResult(count=len(task_ids), task_ids=task_ids)
+
+
+@router.post("/bulk-reschedule", response_model=TaskBulkResult)
+async def bulk_reschedule_tasks(
+        bulk: TaskBulkReschedule,
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Move the due date of every task matching the filter by `shift`, e.g. P1D
+    moves today's tasks to tomorrow.
+
+    Returns:
+    - 200: Count and ids of the moved tasks
+    - 422: If no filter is given
+    """
+
+    task_ids = await bulk_reschedule(db, current_user.id, bulk.filter, bulk.shift)
+    return TaskBulkResult(count=len(task_ids), task_ids=task_ids)
+
+
+@router.post("/bulk-delete", response_model=TaskBulkResult)
+async def bulk_delete_tasks(
+        bulk: TaskBulkDelete,
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Delete every task matching the filter.
+
+    Returns:
+    - 200: Count and ids of the deleted tasks
+    - 422: If no filter is given
+    """
+
+    task_ids = await bulk_delete(db, current_user.id, bulk.filter)
+    return TaskBulkResult(count=len(task_ids), task_ids=task_ids)
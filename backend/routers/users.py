@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.database import get_db
+from db.database import get_db, get_read_db
 from models.users import User
 from schemas.users import UserCreate, UserResponse, UserChangePassword, UserUpdate, LoginResponse
 from services.user_service import (
     create_user,
     get_user_by_email,
     authenticate_user, update_last_login, change_user_password, update_user_full_name, get_current_user,
+    get_current_user_read, invalidate_cached_user, load_user_picture,
 )
-from core.security import create_access_token, create_refresh_token
+from core.rate_limit import limit_login, limit_registration
+from core.security import create_access_token, create_refresh_token, new_token_family
 
 from schemas.users import PictureUpdateRequest
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.post("/register", response_model=UserResponse)
+@router.post("/register", response_model=UserResponse, dependencies=[Depends(limit_registration)])
 async def register_user(
         user: UserCreate,
         db: AsyncSession = Depends(get_db)
@@ -33,7 +35,7 @@ async def register_user(
     return await create_user(db=db, user_data=user)
 
 
-@router.post("/login", response_model=LoginResponse)
+@router.post("/login", response_model=LoginResponse, dependencies=[Depends(limit_login)])
 async def login_user(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: AsyncSession = Depends(get_db)
@@ -45,8 +47,9 @@ async def login_user(
 
     user = await update_last_login(db, user)
 
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    family_id = new_token_family()
+    access_token = create_access_token(data={"sub": str(user.id), "fam": family_id})
+    refresh_token = create_refresh_token(data={"sub": str(user.id), "fam": family_id})
 
     return {
         "tokens": {
@@ -62,10 +65,13 @@ async def login_user(
 
 
 @router.get("/profile-details", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(
+        current_user: User = Depends(get_current_user_read),
+        db: AsyncSession = Depends(get_read_db)
+):
     """Get current authenticated user's profile"""
 
-    return current_user
+    return await load_user_picture(db, current_user)
 
 
 @router.patch("/profile-update", response_model=UserResponse)
@@ -126,6 +132,7 @@ async def upload_profile_picture_base64(
     current_user.picture = picture_data
     db.add(current_user)
     await db.commit()
+    await invalidate_cached_user(current_user.id)
     await db.refresh(current_user)
 
     return current_user
@@ -1,6 +1,22 @@
-from datetime import datetime, date
-from typing import Optional
-from pydantic import BaseModel, field_validator
+import enum
+from datetime import datetime, date, timedelta
+from typing import List, Optional
+from pydantic import BaseModel, field_validator, model_validator
+
+from models.tasks import TaskPriority
+from services.recurrence import validate_rule
+
+
+def validate_recurrence_rule(value: Optional[str]) -> Optional[str]:
+    if value:
+        validate_rule(value)
+    return value or None
+
+
+class TaskSort(str, enum.Enum):
+    created = "created"
+    priority = "priority"
+    due_date = "due_date"
 
 
 class TaskBase(BaseModel):
@@ -8,7 +24,8 @@ class TaskBase(BaseModel):
     description: Optional[str] = None
     completed: bool = False
     due_date: datetime
-    priority: str
+    priority: TaskPriority
+    recurrence_rule: Optional[str] = None
 
 
 class TaskCreate(TaskBase):
@@ -20,14 +37,19 @@ class TaskCreate(TaskBase):
             raise ValueError("Due date cannot be in the past")
         return value
 
+    _validate_recurrence_rule = field_validator("recurrence_rule")(validate_recurrence_rule)
+
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     completed: Optional[bool] = None
     due_date: Optional[datetime] = None
-    priority: Optional[str] = None
+    priority: Optional[TaskPriority] = None
     notification_id: Optional[str] = None
+    recurrence_rule: Optional[str] = None
+
+    _validate_recurrence_rule = field_validator("recurrence_rule")(validate_recurrence_rule)
 
     @field_validator("due_date")
     @classmethod
@@ -44,6 +66,56 @@ class TaskResponse(TaskBase):
     created_at: datetime
     completed_at: Optional[datetime] = None
     notification_id: Optional[str] = None
+    next_occurrence: Optional[datetime] = None
+    # Set on occurrences of a series, a virtual (not materialized) one has id == recurrence_parent_id
+    recurrence_parent_id: Optional[int] = None
+    occurrence_date: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class TaskBulkFilter(BaseModel):
+    """Tasks a bulk operation applies to, every given condition has to match."""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    due_before: Optional[datetime] = None
+    priority: Optional[List[TaskPriority]] = None
+    completed: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def validate_filter(self) -> "TaskBulkFilter":
+        if all(getattr(self, field) in (None, []) for field in type(self).model_fields):
+            raise ValueError("At least one filter is required")
+        if self.end_date and not self.start_date:
+            raise ValueError("end_date requires start_date")
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValueError("end_date cannot be before start_date")
+        return self
+
+
+class TaskBulkComplete(BaseModel):
+    filter: TaskBulkFilter
+    # False reopens the matching tasks
+    completed: bool = True
+
+
+class TaskBulkReschedule(BaseModel):
+    filter: TaskBulkFilter
+    shift: timedelta
+
+    @field_validator("shift")
+    @classmethod
+    def validate_shift(cls, value: timedelta) -> timedelta:
+        if not value:
+            raise ValueError("shift cannot be zero")
+        return value
+
+
+class TaskBulkDelete(BaseModel):
+    filter: TaskBulkFilter
+
+
+class TaskBulkResult(BaseModel):
+    count: int
+    task_ids: List[int]
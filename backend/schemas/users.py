@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -48,6 +48,25 @@ class PictureUpdateRequest(BaseModel):
     picture: str
 
 
+class AdminUserListItem(UserBase):
+    """User row for admin listings, without the (potentially large) picture."""
+    id: int
+    # Nullable columns, legacy rows may hold NULL
+    is_verified: Optional[bool] = None
+    is_active: Optional[bool] = None
+    auth_provider: Optional[str] = None
+    created_at: datetime
+    last_login: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AdminUserPage(BaseModel):
+    items: List[AdminUserListItem]
+    next_cursor: Optional[int] = None
+
+
 class AdminUserUpdate(BaseModel):
     is_active: Optional[bool] = None
     new_password: Optional[str] = None
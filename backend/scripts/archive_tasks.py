@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+import logging
+
+from core.log import setup_logging
+from services.task_archive import archive_completed_tasks, run_archiver
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    Moves old completed tasks to tasks_archive. Runs continuously as its own
+    process (docker compose service `archiver`), or once with --once, e.g. from cron.
+    """
+    parser = argparse.ArgumentParser(description="Archive old completed tasks")
+    parser.add_argument("--once", action="store_true", help="archive once and exit")
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.once:
+        total = asyncio.run(archive_completed_tasks())
+        logger.info(f"Archived {total} completed tasks")
+    else:
+        asyncio.run(run_archiver())
+
+
+if __name__ == "__main__":
+    main()
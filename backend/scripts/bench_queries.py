@@ -0,0 +1,75 @@
+"""
+Measures the CPU spent building and compiling the hot statements, comparing
+plain select() construction with the cached lambda statements in db/queries.py.
+No database connection is needed.
+
+Usage: python -m scripts.bench_queries [--number 20000]
+"""
+import argparse
+import datetime
+import timeit
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import psycopg
+
+from db import queries
+from models.tasks import Task
+from models.users import User
+
+DIALECT = psycopg.dialect()
+TODAY = datetime.date.today()
+
+
+def plain_tasks_by_user(user_id, start_date=None, end_date=None):
+    query = select(Task).where(Task.user_id == user_id)
+    if start_date and not end_date:
+        query = query.where(func.date(Task.due_date) == start_date)
+    elif start_date and end_date:
+        query = query.where(func.date(Task.due_date) >= start_date, func.date(Task.due_date) <= end_date)
+    query = query.order_by(Task.id.desc())
+    if not start_date and not end_date:
+        query = query.where(Task.completed == False).limit(10)
+    return query
+
+
+CASES = {
+    "user by id": (
+        lambda: select(User).where(User.id == 42),
+        lambda: queries.user_by_id(42),
+    ),
+    "task by id": (
+        lambda: select(Task).where(Task.id == 42),
+        lambda: queries.task_by_id(42),
+    ),
+    "tasks by user (latest)": (
+        lambda: plain_tasks_by_user(42),
+        lambda: queries.tasks_by_user(42),
+    ),
+    "tasks by user (range)": (
+        lambda: plain_tasks_by_user(42, TODAY, TODAY + datetime.timedelta(days=7)),
+        lambda: queries.tasks_by_user(42, TODAY, TODAY + datetime.timedelta(days=7)),
+    ),
+}
+
+
+def per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    args = parser.parse_args()
+
+    print(f"{'statement':<24}{'select+key':>12}{'lambda+key':>12}{'compile':>12}{'saved/call':>12}   (microseconds)")
+    for name, (plain, cached) in CASES.items():
+        # Per execution SQLAlchemy builds the statement and derives its cache key,
+        # a cache miss additionally pays for a full compile.
+        plain_cost = per_call_us(lambda: plain()._generate_cache_key(), args.number)
+        cached_cost = per_call_us(lambda: cached()._generate_cache_key(), args.number)
+        compile_cost = per_call_us(lambda: plain().compile(dialect=DIALECT), args.number // 10)
+        print(f"{name:<24}{plain_cost:>12.1f}{cached_cost:>12.1f}{compile_cost:>12.1f}{plain_cost - cached_cost:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
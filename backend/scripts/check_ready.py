@@ -0,0 +1,30 @@
+import logging
+import os
+import sys
+import urllib.request
+
+from core.config import settings
+from core.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_SECONDS = 3
+
+
+def check_ready():
+    """
+    Container healthcheck, exits non-zero unless this container's readiness
+    endpoint answers 200.
+    """
+    setup_logging()
+    url = f"http://localhost:{os.getenv('PORT', '8000')}{settings.API_PREFIX}/health/ready"
+    try:
+        with urllib.request.urlopen(url, timeout=TIMEOUT_SECONDS):
+            pass
+    except Exception as e:
+        logger.error(f"Not ready: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    check_ready()
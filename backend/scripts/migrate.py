@@ -0,0 +1,104 @@
+import argparse
+import logging
+import time
+
+import psycopg
+from alembic import command
+
+from core.config import settings
+from core.log import setup_logging
+from db.migration_impact import analyze, dangerous, format_report, table_sizes, upgrade_sql
+from db.migrations import CURRENT_REVISIONS_SQL, alembic_config, head_revisions, migration_state
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIMEOUT_SECONDS = 120
+RETRY_SECONDS = 5
+
+
+def get_current_revisions(db_conn_str: str) -> set[str]:
+    with psycopg.connect(db_conn_str, connect_timeout=5) as conn:
+        try:
+            rows = conn.execute(CURRENT_REVISIONS_SQL).fetchall()
+        except psycopg.errors.UndefinedTable:
+            return set()
+    return {row[0] for row in rows}
+
+
+def wait_for_revisions(db_conn_str: str, until_migrated: bool = False) -> set[str]:
+    """
+    Current revisions once the database accepts connections, and with
+    until_migrated once it's no longer behind this release's head.
+    """
+    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+    while True:
+        try:
+            current = get_current_revisions(db_conn_str)
+            if not until_migrated or migration_state(current) != "behind":
+                return current
+            reason = f"database at {', '.join(sorted(current)) or 'empty'}, waiting for migrations"
+        except psycopg.OperationalError as e:
+            reason = f"database not ready yet: {e}"
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Gave up after {WAIT_TIMEOUT_SECONDS} seconds, {reason}")
+        logger.info(f"{reason.capitalize()}, retrying in {RETRY_SECONDS} seconds...")
+        time.sleep(RETRY_SECONDS)
+
+
+def migrate():
+    """
+    Upgrades the database to head once it's reachable, skipping Alembic's
+    env.py (and the model imports it pulls in) entirely when the schema is
+    already up to date.
+    """
+    heads = head_revisions()
+    current = wait_for_revisions(settings.DATABASE_URL.replace("+psycopg", ""))
+
+    if current == heads:
+        logger.info(f"Database is already at head ({', '.join(sorted(heads))}), skipping migrations.")
+        return
+
+    logger.info(f"Upgrading database from {', '.join(sorted(current)) or 'empty'} to head...")
+    command.upgrade(alembic_config(), "head")
+
+
+def dry_run(db_conn_str: str, max_blocking_seconds: float) -> int:
+    """
+    Reports the lock and rewrite impact of the pending migrations, sized by
+    the database at db_conn_str (a local copy of production, nothing is
+    executed). Exit status 1 when a statement blocks writes for longer than
+    max_blocking_seconds or isn't recognized.
+    """
+    current = get_current_revisions(db_conn_str)
+    sizes = table_sizes(db_conn_str)
+    impacts = analyze(upgrade_sql(current), sizes)
+    print(format_report(impacts, sizes, max_blocking_seconds))
+    return 1 if any(dangerous(impact, max_blocking_seconds) for impact in impacts) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the database to head")
+    parser.add_argument("--wait", action="store_true",
+                        help="only wait until the database is migrated, e.g. by the backend container")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only report the lock and rewrite impact of pending migrations")
+    parser.add_argument("--database-url",
+                        help="database the dry run sizes tables by, e.g. a restored copy of production")
+    parser.add_argument("--max-blocking-seconds", type=float, default=1.0,
+                        help="dry run fails on statements blocking writes for longer than this")
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.dry_run:
+        database_url = args.database_url or settings.DATABASE_URL
+        raise SystemExit(dry_run(database_url.replace("+psycopg", ""), args.max_blocking_seconds))
+    if args.wait:
+        wait_for_revisions(settings.DATABASE_URL.replace("+psycopg", ""), until_migrated=True)
+        logger.info("Database is migrated.")
+    else:
+        migrate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import asyncio
+
+from core.log import setup_logging
+from services.reminders import build_scheduler
+
+
+def run_scheduler():
+    """
+    Runs the server-side reminder scheduler. Meant as its own process next to
+    the API, e.g. docker compose service `reminders`.
+    """
+    setup_logging()
+    asyncio.run(build_scheduler().run())
+
+
+if __name__ == "__main__":
+    run_scheduler()
@@ -0,0 +1,96 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from db.database import engine, engine_options, replica_router
+from db.migrations import CURRENT_REVISIONS_SQL, head_revisions, migration_state
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessCheck:
+    """
+    Whether this worker can serve requests: a SELECT 1 through the real pool
+    and the database's migration state. The check runs at most once per
+    interval, concurrent probes share one run and its cached result, so load
+    balancer probes don't add database load. An exhausted pool makes the
+    check time out, which takes the worker out of rotation until it recovers.
+    """
+
+    def __init__(self, engine: AsyncEngine, interval: int, timeout: int):
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at: float = 0
+        self._lock = asyncio.Lock()
+
+    async def status(self) -> Dict[str, Any]:
+        if self._result is None or time.monotonic() - self._checked_at >= self.interval:
+            async with self._lock:
+                if self._result is None or time.monotonic() - self._checked_at >= self.interval:
+                    self._result = await self._check()
+                    self._checked_at = time.monotonic()
+        # Pool and replica state is in memory, always reported fresh
+        return {**self._result, "pool": self.pool_stats(), "replicas": self.replica_stats()}
+
+    async def _check(self) -> Dict[str, Any]:
+        database: Dict[str, Any] = {"ok": False}
+        migrations: Dict[str, Any] = {"state": "unknown", "head": sorted(head_revisions())}
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with self.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    database.update(ok=True, latency_ms=round((time.perf_counter() - start) * 1000, 2))
+                    try:
+                        current = (await conn.execute(text(CURRENT_REVISIONS_SQL))).scalars().all()
+                    except ProgrammingError:
+                        # No alembic_version table, nothing migrated yet
+                        current = []
+            migrations.update(state=migration_state(current), database=sorted(current))
+        except Exception as e:
+            error = "timed out" if isinstance(e, TimeoutError) else str(e).splitlines()[0]
+            if database["ok"]:
+                migrations["error"] = error
+            else:
+                database["error"] = error
+                logger.warning(f"Readiness check failed: {error}")
+
+        ready = database["ok"] and migrations["state"] in ("current", "ahead")
+        return {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "database": database,
+            "migrations": migrations,
+        }
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """This worker's pool, every gunicorn worker has its own."""
+        pool = self.engine.pool
+        capacity = engine_options["pool_size"] + engine_options["max_overflow"]
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "capacity": capacity,
+            "saturation": round(pool.checkedout() / capacity, 4),
+        }
+
+    @staticmethod
+    def replica_stats() -> list:
+        return [{"host": replica.engine.url.host, "healthy": replica.healthy} for replica in replica_router.replicas]
+
+
+readiness_check = ReadinessCheck(
+    engine,
+    interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,89 @@
+import asyncio
+import datetime
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update, values, column, Integer, DateTime
+
+from core.config import settings
+from db.database import SessionLocal
+from models.users import User
+
+logger = logging.getLogger(__name__)
+
+# Two bind parameters per login, well below the 65535 a statement can have
+FLUSH_BATCH_SIZE = 1000
+
+
+class LastLoginBuffer:
+    """
+    Collects last_login timestamps in memory and writes them periodically with
+    UPDATE ... FROM (VALUES ...) statements of FLUSH_BATCH_SIZE rows, keeping
+    the write off the login path. Repeated logins of one user between flushes
+    collapse into one row.
+    """
+
+    def __init__(self, flush_interval: int):
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, datetime.datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, logged_in_at: datetime.datetime) -> None:
+        previous = self._pending.get(user_id)
+        if previous is None or logged_in_at > previous:
+            self._pending[user_id] = logged_in_at
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        # Sorted ids keep the row lock order the same across workers
+        logins = sorted(pending.items())
+        for start in range(0, len(logins), FLUSH_BATCH_SIZE):
+            try:
+                await self._write(logins[start:start + FLUSH_BATCH_SIZE])
+            except Exception as e:
+                logger.warning(f"Failed to flush {len(logins) - start} last login updates, retrying later: {e}")
+                for user_id, logged_in_at in logins[start:]:
+                    self.record(user_id, logged_in_at)
+                return
+
+    @staticmethod
+    async def _write(batch: List[Tuple[int, datetime.datetime]]) -> None:
+        logins = values(
+            column("id", Integer),
+            column("last_login", DateTime(timezone=True)),
+            name="logins",
+        ).data(batch)
+        stmt = (
+            update(User)
+            .where(User.id == logins.c.id)
+            .values(last_login=logins.c.last_login)
+            .execution_options(synchronize_session=False)
+        )
+        async with SessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+last_login_buffer = LastLoginBuffer(flush_interval=settings.LAST_LOGIN_FLUSH_INTERVAL_SECONDS)
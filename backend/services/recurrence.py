@@ -0,0 +1,239 @@
+"""
+Subset of RFC 5545 RRULE used for recurring tasks:
+FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, COUNT, UNTIL (YYYYMMDD or
+YYYYMMDDTHHMMSSZ) and BYDAY (weekly rules only), e.g. "FREQ=WEEKLY;BYDAY=MO,WE".
+Series end at the last date Python can represent, at the latest.
+"""
+import calendar
+import dataclasses
+import datetime
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQUENCIES = {"DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+# Upper bound of occurrences expanded for one series in one request
+MAX_EXPANDED_OCCURRENCES = 500
+# Limits of rules accepted from clients (validate_rule), COUNT is iterated for
+# monthly and yearly rules
+MAX_COUNT = 5000
+MAX_UNTIL = datetime.datetime(2200, 1, 1, tzinfo=datetime.UTC)
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime.datetime] = None
+    by_day: Tuple[int, ...] = ()
+
+
+def _parse_until(value: str) -> datetime.datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%d"):
+        try:
+            until = datetime.datetime.strptime(value, fmt).replace(tzinfo=datetime.UTC)
+        except ValueError:
+            continue
+        # A date-only UNTIL includes the whole day
+        return until + datetime.timedelta(days=1, microseconds=-1) if fmt == "%Y%m%d" else until
+    raise ValueError(f"Invalid UNTIL value: {value}")
+
+
+def parse_rule(rule: str) -> RecurrenceRule:
+    """Parse and validate a rule, raising ValueError for anything outside the supported subset."""
+    parts = {}
+    for part in rule.removeprefix("RRULE:").split(";"):
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid recurrence rule part: {part!r}")
+        parts[key.upper()] = value.upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(sorted(FREQUENCIES))}")
+
+    interval = int(parts.pop("INTERVAL", "1"))
+    count = int(parts["COUNT"]) if "COUNT" in parts else None
+    parts.pop("COUNT", None)
+    until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    by_day = ()
+    if "BYDAY" in parts:
+        days = parts.pop("BYDAY").split(",")
+        if not set(days) <= WEEKDAYS.keys():
+            raise ValueError(f"BYDAY must be a list of {', '.join(WEEKDAYS)}")
+        by_day = tuple(sorted({WEEKDAYS[day] for day in days}))
+
+    if parts:
+        raise ValueError(f"Unsupported recurrence rule parts: {', '.join(parts)}")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+    if count is not None and until is not None:
+        raise ValueError("COUNT and UNTIL can't be combined")
+    if by_day and freq != "WEEKLY":
+        raise ValueError("BYDAY is only supported for weekly rules")
+
+    return RecurrenceRule(freq=freq, interval=interval, count=count, until=until, by_day=by_day)
+
+
+def validate_rule(rule: str) -> RecurrenceRule:
+    """parse_rule, also rejecting COUNT and UNTIL beyond MAX_COUNT and MAX_UNTIL."""
+    parsed = parse_rule(rule)
+    if parsed.count is not None and parsed.count > MAX_COUNT:
+        raise ValueError(f"COUNT can't be more than {MAX_COUNT}")
+    if parsed.until is not None and parsed.until >= MAX_UNTIL:
+        raise ValueError(f"UNTIL must be before {MAX_UNTIL:%Y-%m-%d}")
+    return parsed
+
+
+def _add_months(value: datetime.datetime, months: int) -> Optional[datetime.datetime]:
+    """
+    Same day in a later month, or None if that month is too short (as RFC 5545
+    skips it). OverflowError past datetime.MAXYEAR.
+    """
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    if year > datetime.MAXYEAR:
+        raise OverflowError(f"year {year} is out of range")
+    if value.day > calendar.monthrange(year, month)[1]:
+        return None
+    return value.replace(year=year, month=month)
+
+
+def _candidates(rule: RecurrenceRule, dtstart: datetime.datetime, after: datetime.datetime) -> Iterator[Tuple[int, datetime.datetime]]:
+    """
+    (index, occurrence) pairs in order, ending where dates overflow. Without
+    COUNT, periods entirely before `after` are skipped arithmetically instead
+    of being iterated.
+    """
+    try:
+        yield from _unbounded_candidates(rule, dtstart, after)
+    except OverflowError:
+        return
+
+
+def _unbounded_candidates(rule: RecurrenceRule, dtstart: datetime.datetime, after: datetime.datetime) -> Iterator[Tuple[int, datetime.datetime]]:
+    if rule.freq == "DAILY":
+        step = datetime.timedelta(days=rule.interval)
+        first = 0 if rule.count is not None or after <= dtstart else (after - dtstart) // step
+        for period in range(first, 1 << 31):
+            yield period, dtstart + period * step
+
+    elif rule.freq == "WEEKLY":
+        step = datetime.timedelta(weeks=rule.interval)
+        days = rule.by_day or (dtstart.weekday(),)
+        week_start = dtstart - datetime.timedelta(days=dtstart.weekday())
+        first = 0 if rule.count is not None or after <= dtstart else max(0, (after - week_start) // step)
+        index = 0
+        for period in range(first, 1 << 31):
+            for day in days:
+                occurrence = week_start + period * step + datetime.timedelta(days=day)
+                if occurrence >= dtstart:
+                    yield index, occurrence
+                    index += 1
+
+    else:
+        months = rule.interval * (12 if rule.freq == "YEARLY" else 1)
+        index = 0
+        for period in range(1 << 31):
+            occurrence = _add_months(dtstart, period * months)
+            if occurrence is not None:
+                yield index, occurrence
+                index += 1
+
+
+def occurrences(
+        rule: RecurrenceRule,
+        dtstart: datetime.datetime,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        limit: int = MAX_EXPANDED_OCCURRENCES,
+) -> Iterator[datetime.datetime]:
+    """Occurrences of the series within [start, end), at most `limit` of them."""
+    produced = 0
+    for index, occurrence in _candidates(rule, dtstart, start):
+        if occurrence >= end or produced >= limit:
+            return
+        if rule.count is not None and index >= rule.count:
+            return
+        if rule.until is not None and occurrence > rule.until:
+            return
+        if occurrence >= start:
+            produced += 1
+            yield occurrence
+
+
+def next_occurrence(
+        rule: RecurrenceRule,
+        dtstart: datetime.datetime,
+        after: datetime.datetime,
+        skip: frozenset = frozenset(),
+) -> Optional[datetime.datetime]:
+    """First occurrence >= after that is not in skip, or None when the series has ended."""
+    far_future = datetime.datetime.max.replace(tzinfo=datetime.UTC)
+    for occurrence in occurrences(rule, dtstart, after, far_future, limit=len(skip) + 1):
+        if occurrence not in skip:
+            return occurrence
+    return None
+
+
+def last_occurrence(rule: RecurrenceRule, dtstart: datetime.datetime) -> Optional[datetime.datetime]:
+    """
+    End of a bounded series (COUNT or UNTIL), None for an endless one. Computed
+    from the period arithmetic, only COUNT of monthly and yearly rules (whose
+    short months are skipped) is iterated, validate_rule bounds it.
+    """
+    if rule.count is None and rule.until is None:
+        return None
+    far_future = datetime.datetime.max.replace(tzinfo=datetime.UTC)
+    if rule.until is None and (rule.freq == "MONTHLY" or rule.freq == "YEARLY"):
+        last = None
+        for last in occurrences(rule, dtstart, dtstart, far_future, limit=rule.count):
+            pass
+        return last
+    try:
+        return _last_until(rule, dtstart) if rule.until is not None else _last_count(rule, dtstart)
+    except OverflowError:
+        # The COUNT-th occurrence is past the last representable date, the series ends before it
+        return _last_until(dataclasses.replace(rule, count=None, until=far_future), dtstart)
+
+
+def _last_count(rule: RecurrenceRule, dtstart: datetime.datetime) -> datetime.datetime:
+    """COUNT-th occurrence of a daily or weekly rule."""
+    if rule.freq == "DAILY":
+        return dtstart + (rule.count - 1) * datetime.timedelta(days=rule.interval)
+
+    step = datetime.timedelta(weeks=rule.interval)
+    days = rule.by_day or (dtstart.weekday(),)
+    week_start = dtstart - datetime.timedelta(days=dtstart.weekday())
+    # Days of the first week before dtstart are skipped
+    first_week = [day for day in days if day >= dtstart.weekday()]
+    if rule.count <= len(first_week):
+        return week_start + datetime.timedelta(days=first_week[rule.count - 1])
+    period, slot = divmod(rule.count - len(first_week) - 1, len(days))
+    return week_start + (period + 1) * step + datetime.timedelta(days=days[slot])
+
+
+def _last_until(rule: RecurrenceRule, dtstart: datetime.datetime) -> Optional[datetime.datetime]:
+    """Last occurrence <= UNTIL, None when UNTIL is before the first one."""
+    if rule.until < dtstart:
+        return None
+    far_future = datetime.datetime.max.replace(tzinfo=datetime.UTC)
+
+    if rule.freq == "DAILY" or rule.freq == "WEEKLY":
+        # Each day of the rule repeats once per period, so the last occurrence is within one period of UNTIL
+        step = datetime.timedelta(days=rule.interval) if rule.freq == "DAILY" else datetime.timedelta(weeks=rule.interval)
+        start = dtstart if rule.until - dtstart <= step else rule.until - step
+        last = None
+        for last in occurrences(rule, dtstart, start, far_future):
+            pass
+        return last
+
+    # The last period starting before UNTIL, then back over months too short for the day
+    months = rule.interval * (12 if rule.freq == "YEARLY" else 1)
+    elapsed = (rule.until.year - dtstart.year) * 12 + rule.until.month - dtstart.month
+    for period in range(elapsed // months, -1, -1):
+        occurrence = _add_months(dtstart, period * months)
+        if occurrence is not None and occurrence <= rule.until:
+            return occurrence
+    return None
@@ -0,0 +1,149 @@
+import asyncio
+import datetime
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update, tuple_
+
+from core.config import settings
+from db.database import SessionLocal
+from models.tasks import Task
+
+logger = logging.getLogger(__name__)
+
+TICK_SECONDS = 1
+# How often the window is re-read, picks up tasks created or moved meanwhile
+REFRESH_SECONDS = 30
+# Tasks whose reminder time passed longer ago than this (e.g. while the
+# scheduler was down) are skipped instead of reminded late
+MISSED_REMINDER_GRACE = datetime.timedelta(hours=1)
+
+
+@dataclass
+class Reminder:
+    task_id: int
+    user_id: int
+    title: str
+    due_date: datetime.datetime
+
+
+class LogNotifier:
+    """Local stub, prints reminders instead of delivering them."""
+
+    async def send(self, reminders: List[Reminder]) -> None:
+        for reminder in reminders:
+            logger.info(
+                f"Reminder for user {reminder.user_id}: '{reminder.title}' is due at {reminder.due_date.isoformat()}",
+                extra={"task_id": reminder.task_id, "user_id": reminder.user_id},
+            )
+
+
+NOTIFIERS = {
+    "log": LogNotifier,
+}
+
+
+class ReminderScheduler:
+    """
+    Keeps the reminders due within the next horizon in a heap ordered by fire
+    time. The heap is refilled by an indexed range query every REFRESH_SECONDS,
+    and every tick the due reminders are claimed and dispatched as one batch.
+    """
+
+    def __init__(self, notifier, lead: datetime.timedelta, horizon: datetime.timedelta, batch_size: int):
+        self.notifier = notifier
+        self.lead = lead
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self._heap: List[Tuple[datetime.datetime, int]] = []
+        # Fire time per scheduled task, a changed due date pushes a new heap entry
+        self._scheduled: Dict[int, datetime.datetime] = {}
+
+    async def load(self, now: datetime.datetime) -> None:
+        """Add pending reminders firing before now + horizon, in batches of batch_size."""
+        # Fire time is due_date - lead, so the due_date range is shifted by the lead
+        window_end = now + self.horizon + self.lead
+        cursor = (now - MISSED_REMINDER_GRACE + self.lead, 0)
+        async with SessionLocal() as db:
+            while True:
+                query = (
+                    select(Task.id, Task.due_date)
+                    .where(
+                        Task.completed == False,
+                        Task.reminded_at.is_(None),
+                        Task.due_date < window_end,
+                        tuple_(Task.due_date, Task.id) > cursor,
+                    )
+                    .order_by(Task.due_date, Task.id)
+                    .limit(self.batch_size)
+                )
+                rows = (await db.execute(query)).all()
+                for task_id, due_date in rows:
+                    fire_at = due_date - self.lead
+                    if self._scheduled.get(task_id) != fire_at:
+                        self._scheduled[task_id] = fire_at
+                        heapq.heappush(self._heap, (fire_at, task_id))
+                if len(rows) < self.batch_size:
+                    break
+                cursor = (rows[-1].due_date, rows[-1].id)
+
+    def pop_due(self, now: datetime.datetime) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, task_id = heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) == fire_at:
+                del self._scheduled[task_id]
+                due.append(task_id)
+        return due
+
+    async def dispatch(self, task_ids: List[int], now: datetime.datetime) -> None:
+        """
+        Claim the reminders with one UPDATE, so tasks completed or moved in the
+        meantime (or claimed by another scheduler instance) are skipped.
+        """
+        for start in range(0, len(task_ids), self.batch_size):
+            batch = task_ids[start:start + self.batch_size]
+            async with SessionLocal() as db:
+                result = await db.execute(
+                    update(Task)
+                    .where(
+                        Task.id.in_(batch),
+                        Task.completed == False,
+                        Task.reminded_at.is_(None),
+                        Task.due_date <= now + self.lead,
+                    )
+                    .values(reminded_at=now)
+                    .returning(Task.id, Task.user_id, Task.title, Task.due_date)
+                    .execution_options(synchronize_session=False)
+                )
+                reminders = [Reminder(*row) for row in result.all()]
+                await db.commit()
+            if reminders:
+                await self.notifier.send(reminders)
+
+    async def run(self) -> None:
+        logger.info(f"Reminder scheduler started, lead {self.lead}, horizon {self.horizon}")
+        next_refresh = datetime.datetime.now(datetime.UTC)
+        while True:
+            now = datetime.datetime.now(datetime.UTC)
+            try:
+                if now >= next_refresh:
+                    await self.load(now)
+                    next_refresh = now + datetime.timedelta(seconds=REFRESH_SECONDS)
+                due = self.pop_due(now)
+                if due:
+                    await self.dispatch(due, now)
+            except Exception as e:
+                logger.exception(f"Reminder scheduler tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+
+def build_scheduler() -> ReminderScheduler:
+    return ReminderScheduler(
+        notifier=NOTIFIERS[settings.REMINDER_NOTIFIER](),
+        lead=datetime.timedelta(minutes=settings.REMINDER_LEAD_MINUTES),
+        horizon=datetime.timedelta(seconds=settings.REMINDER_HORIZON_SECONDS),
+        batch_size=settings.REMINDER_BATCH_SIZE,
+    )
@@ -0,0 +1,101 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from db.database import SessionLocal
+from models.tasks import Task, ArchivedTask
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = [
+    "id", "user_id", "title", "description", "due_date", "priority", "created_at", "completed_at",
+    "completed", "notification_id", "recurrence_parent_id", "occurrence_date",
+]
+
+
+def archive_cutoff(now: datetime.datetime) -> datetime.datetime:
+    """Tasks completed and due before this may live in the archive."""
+    return now - datetime.timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+
+
+async def archive_batch(cutoff: datetime.datetime, batch_size: int) -> int:
+    """
+    Move one batch of tasks completed and due before the cutoff with a single
+    DELETE ... RETURNING feeding an INSERT, so a task is never in both tables.
+    Recurring series stay, only their materialized occurrences are archived.
+    """
+    candidates = (
+        select(Task.id)
+        .where(
+            Task.completed == True,
+            Task.recurrence_rule.is_(None),
+            Task.completed_at < cutoff,
+            Task.due_date < cutoff,
+        )
+        .order_by(Task.completed_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(Task)
+        .where(Task.id.in_(candidates.scalar_subquery()))
+        .returning(*(getattr(Task, column) for column in ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    stmt = (
+        insert(ArchivedTask)
+        .from_select(ARCHIVED_COLUMNS, select(*(moved.c[column] for column in ARCHIVED_COLUMNS)))
+        .returning(ArchivedTask.id)
+    )
+    async with SessionLocal() as db:
+        result = await db.execute(stmt)
+        count = len(result.all())
+        await db.commit()
+    return count
+
+
+async def restore_task(db: AsyncSession, task_id: int) -> bool:
+    """
+    Move an archived task back into `tasks`, in the caller's transaction, so
+    it can be changed or deleted like any other. It's archived again once it
+    qualifies. Returns whether it was in the archive.
+    """
+    moved = (
+        delete(ArchivedTask)
+        .where(ArchivedTask.id == task_id)
+        .returning(*(getattr(ArchivedTask, column) for column in ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    stmt = (
+        insert(Task)
+        .from_select(ARCHIVED_COLUMNS, select(*(moved.c[column] for column in ARCHIVED_COLUMNS)))
+        .returning(Task.id)
+    )
+    return (await db.execute(stmt)).first() is not None
+
+
+async def archive_completed_tasks(batch_size: int = settings.TASK_ARCHIVE_BATCH_SIZE) -> int:
+    """Archive everything past the cutoff in batches, short transactions keep locks brief."""
+    cutoff = archive_cutoff(datetime.datetime.now(datetime.UTC))
+    total = 0
+    while True:
+        count = await archive_batch(cutoff, batch_size)
+        total += count
+        if count < batch_size:
+            return total
+
+
+async def run_archiver() -> None:
+    logger.info(f"Task archiver started, archiving tasks completed {settings.TASK_ARCHIVE_AFTER_DAYS} days ago")
+    while True:
+        try:
+            total = await archive_completed_tasks()
+            if total:
+                logger.info(f"Archived {total} completed tasks")
+        except Exception as e:
+            logger.exception(f"Task archiving failed: {e}")
+        await asyncio.sleep(settings.TASK_ARCHIVE_INTERVAL_SECONDS)
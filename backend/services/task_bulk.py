@@ -0,0 +1,84 @@
+"""
+Filter based bulk changes of a user's tasks, each one a single
+UPDATE/DELETE ... WHERE user_id = ... RETURNING id instead of one request and
+statement per task. Recurring series are never matched (like date ranges
+in tasks_by_user), their materialized occurrences are ordinary tasks and are.
+"""
+import datetime
+from typing import List
+
+from sqlalchemy import update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.tasks import Task
+from schemas.tasks import TaskBulkFilter
+from services.task_events import notify_task_changes
+
+
+def task_filter_criteria(user_id: int, task_filter: TaskBulkFilter) -> list:
+    criteria = [Task.user_id == user_id, Task.recurrence_rule.is_(None)]
+
+    # Whole UTC days as a half-open range, so the due date index can be used
+    if task_filter.start_date:
+        start = datetime.datetime.combine(task_filter.start_date, datetime.time.min, datetime.UTC)
+        end = datetime.datetime.combine(task_filter.end_date or task_filter.start_date, datetime.time.min, datetime.UTC)
+        criteria += [Task.due_date >= start, Task.due_date < end + datetime.timedelta(days=1)]
+    if task_filter.due_before:
+        criteria.append(Task.due_date < task_filter.due_before)
+    if task_filter.priority:
+        criteria.append(Task.priority.in_(task_filter.priority))
+    if task_filter.completed is not None:
+        criteria.append(Task.completed == task_filter.completed)
+
+    return criteria
+
+
+async def bulk_complete(db: AsyncSession, user_id: int, task_filter: TaskBulkFilter, completed: bool) -> List[int]:
+    """
+    Complete (or reopen) the matching tasks, completed_at and reminders are
+    handled like update_task does. Tasks already in that state are left as they are.
+    """
+    values = {"completed": completed}
+    if completed:
+        values["completed_at"] = datetime.datetime.now(datetime.UTC)
+    else:
+        # A reopened task gets a new server-side reminder
+        values.update(completed_at=None, reminded_at=None)
+
+    stmt = (
+        update(Task)
+        .where(*task_filter_criteria(user_id, task_filter), Task.completed != completed)
+        .values(**values)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    return await _execute(db, stmt, user_id, "updated")
+
+
+async def bulk_reschedule(db: AsyncSession, user_id: int, task_filter: TaskBulkFilter, shift: datetime.timedelta) -> List[int]:
+    """Move the due dates of the matching tasks by shift, they get new reminders."""
+    stmt = (
+        update(Task)
+        .where(*task_filter_criteria(user_id, task_filter))
+        .values(due_date=Task.due_date + shift, reminded_at=None)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    return await _execute(db, stmt, user_id, "updated")
+
+
+async def bulk_delete(db: AsyncSession, user_id: int, task_filter: TaskBulkFilter) -> List[int]:
+    stmt = (
+        delete(Task)
+        .where(*task_filter_criteria(user_id, task_filter))
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    return await _execute(db, stmt, user_id, "deleted")
+
+
+async def _execute(db: AsyncSession, stmt, user_id: int, action: str) -> List[int]:
+    task_ids = list((await db.execute(stmt)).scalars().all())
+    await notify_task_changes(db, user_id, task_ids, action)
+    await db.commit()
+    return task_ids
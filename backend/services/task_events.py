@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Sequence, Set
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TASK_CHANNEL = "task_changes"
+SUBSCRIBER_QUEUE_SIZE = 100
+RECONNECT_DELAY_SECONDS = 5
+
+
+async def notify_task_change(db: AsyncSession, user_id: int, task_id: int, action: str) -> None:
+    """
+    Queue a change notification in the current transaction. Postgres delivers
+    it on commit and drops it on rollback.
+    """
+    payload = json.dumps({"user_id": user_id, "task_id": task_id, "action": action})
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": TASK_CHANNEL, "payload": payload})
+
+
+async def notify_task_changes(db: AsyncSession, user_id: int, task_ids: Sequence[int], action: str) -> None:
+    """Same as notify_task_change for many tasks, queued with a single statement."""
+    if not task_ids:
+        return
+    payloads = [json.dumps({"user_id": user_id, "task_id": task_id, "action": action}) for task_id in task_ids]
+    await db.execute(
+        text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": TASK_CHANNEL, "payloads": payloads},
+    )
+
+
+class TaskEventHub:
+    """
+    Per-worker fan-out of task change notifications. A single LISTEN connection
+    is opened with the first subscriber and every event is handed to the
+    queues of the user it belongs to.
+    """
+
+    def __init__(self, conninfo: str):
+        self.conninfo = conninfo
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        for queue in self._subscribers.get(event.get("user_id"), ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A slow client misses events, it reloads its list on reconnect anyway
+                pass
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {TASK_CHANNEL}")
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Task event listener disconnected, reconnecting: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+task_event_hub = TaskEventHub(conninfo=settings.DATABASE_URL.replace("+psycopg", ""))
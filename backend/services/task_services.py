@@ -1,25 +1,227 @@
-from fastapi import Depends
-from sqlalchemy import select
+import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import Depends, Query
+from pydantic import TypeAdapter
+from sqlalchemy import select, union_all, inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from starlette.exceptions import HTTPException
+from starlette.responses import Response
 
-from db.database import get_db
+from db import queries
+from db.database import get_db, get_read_db
 from models.users import User
-from models.tasks import Task
-from services.user_service import get_current_user
+from models.tasks import Task, TaskPriority, ArchivedTask
+from schemas.tasks import TaskResponse, TaskSort
+from services.recurrence import parse_rule, occurrences, next_occurrence, last_occurrence
+from services.task_archive import restore_task
+from services.user_service import get_current_user, get_current_user_read
 
 
-async def verify_task_ownership(
+TASK_FIELDS = tuple(TaskResponse.model_fields)
+# Always selected with sparse fieldsets, needed to check ownership, expand series and sort
+REQUIRED_TASK_COLUMNS = ("id", "user_id", "due_date", "priority", "recurrence_rule", "next_occurrence")
+_sparse_adapter = TypeAdapter(Any)
+
+
+def task_fields(
+        fields: Optional[str] = Query(None, description="Comma separated TaskResponse fields to return, e.g. id,title,due_date"),
+) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in TASK_FIELDS]
+    if not requested or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(TASK_FIELDS)}")
+    return requested
+
+
+def task_columns(model, fields: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Columns of the model to select for the requested fields, None selects all."""
+    if fields is None:
+        return None
+    return [column for column in dict.fromkeys(REQUIRED_TASK_COLUMNS + tuple(fields)) if column in model.__table__.columns]
+
+
+def sparse_task(task: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: getattr(task, field, None) for field in fields}
+
+
+def sparse_response(content: Any) -> Response:
+    """Sparse task(s) as JSON, serialized without building a TaskResponse per task."""
+    return Response(content=_sparse_adapter.dump_json(content), media_type="application/json")
+
+
+async def _load_owned_task(
         task_id: int,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user),
+        db: AsyncSession,
+        current_user: User,
+        include_archive: bool = False,
+        restore_archived: bool = False,
+        fields: Optional[Sequence[str]] = None,
 ) -> Task:
-    query = select(Task).where(Task.id == task_id)
-    result = await db.execute(query)
+    """
+    The user's task, with include_archive an archived one as is (read-only),
+    with restore_archived an archived one moved back into `tasks` first.
+    """
+    result = await db.execute(queries.task_by_id(task_id, task_columns(Task, fields)))
     task = result.scalars().first()
+    if not task and (include_archive or restore_archived):
+        columns = task_columns(ArchivedTask, fields)
+        options = [load_only(*(getattr(ArchivedTask, column) for column in columns), raiseload=True)] if columns else []
+        task = await db.get(ArchivedTask, task_id, options=options)
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if task.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this task")
+    if isinstance(task, ArchivedTask) and restore_archived:
+        db.expunge(task)
+        await restore_task(db, task_id)
+        task = (await db.execute(queries.task_by_id(task_id))).scalars().first()
+    return task
+
+
+async def verify_task_ownership(
+        task_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+) -> Task:
+    """Writes to an archived task restore it from the archive first."""
+    return await _load_owned_task(task_id, db, current_user, restore_archived=True)
+
+
+async def verify_task_ownership_read(
+        task_id: int,
+        db: AsyncSession = Depends(get_read_db),
+        current_user: User = Depends(get_current_user_read),
+        fields: Optional[Tuple[str, ...]] = Depends(task_fields),
+) -> Task:
+    return await _load_owned_task(task_id, db, current_user, include_archive=True, fields=fields)
+
+
+PRIORITY_RANKS = {priority: rank for rank, priority in enumerate(TaskPriority)}
+
+
+def task_sort_key(sort: TaskSort) -> Callable:
+    """Python counterpart of the queries.tasks_by_user ordering, for lists merged with occurrences."""
+    if sort == TaskSort.priority:
+        return lambda task: (-PRIORITY_RANKS[task.priority], _as_utc(task.due_date), -task.id)
+    if sort == TaskSort.due_date:
+        return lambda task: (_as_utc(task.due_date), -task.id)
+    return lambda task: (-task.id, _as_utc(task.due_date))
+
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    return value if value.tzinfo else value.replace(tzinfo=datetime.UTC)
+
+
+async def materialized_occurrences(
+        db: AsyncSession,
+        series_ids: Iterable[int],
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+) -> Dict[int, Set[datetime.datetime]]:
+    """Occurrence dates that already have their own row, per series, archived ones included."""
+    series_ids = list(series_ids)
+    selects = []
+    for model in (Task, ArchivedTask):
+        query = select(model.recurrence_parent_id, model.occurrence_date).where(model.recurrence_parent_id.in_(series_ids))
+        if since is not None:
+            query = query.where(model.occurrence_date >= since)
+        if until is not None:
+            query = query.where(model.occurrence_date < until)
+        selects.append(query)
+
+    materialized: Dict[int, Set[datetime.datetime]] = {}
+    for series_id, occurrence_date in (await db.execute(union_all(*selects))).all():
+        materialized.setdefault(series_id, set()).add(_as_utc(occurrence_date))
+    return materialized
+
+
+def schedule_series(task: Task, materialized: Iterable[datetime.datetime] = ()) -> None:
+    """Recompute next_occurrence and recurrence_end after the rule, start or state of a series changed."""
+    if not task.recurrence_rule:
+        task.next_occurrence = None
+        task.recurrence_end = None
+        return
+
+    rule = parse_rule(task.recurrence_rule)
+    dtstart = _as_utc(task.due_date)
+    if next_occurrence(rule, dtstart, dtstart) is None:
+        raise HTTPException(status_code=400, detail="Recurrence rule has no occurrences")
+
+    task.recurrence_end = last_occurrence(rule, dtstart)
+    # A completed series has ended, reopening it resumes at the first open occurrence
+    task.next_occurrence = None if task.completed else next_occurrence(rule, dtstart, dtstart, skip=frozenset(materialized))
+
+
+def occurrence_response(series: Task, occurrence: datetime.datetime) -> TaskResponse:
+    """
+    A virtual occurrence, the series with the occurrence as its due date. Built
+    from the loaded attributes only, so it works with sparse fieldsets too.
+    """
+    unloaded = inspect(series).unloaded
+    values = {field: getattr(series, field) for field in TASK_FIELDS if field not in unloaded}
+    values.update(due_date=occurrence, occurrence_date=occurrence, recurrence_parent_id=series.id)
+    return TaskResponse.model_construct(**values)
+
+
+def expand_series(
+        series: Task,
+        materialized: Set[datetime.datetime],
+        start: datetime.datetime,
+        end: datetime.datetime,
+) -> List[TaskResponse]:
+    """Virtual occurrences of a series within [start, end), minus the materialized ones."""
+    rule = parse_rule(series.recurrence_rule)
+    window_start = max(start, _as_utc(series.next_occurrence))
+    return [
+        occurrence_response(series, occurrence)
+        for occurrence in occurrences(rule, _as_utc(series.due_date), window_start, end)
+        if occurrence not in materialized
+    ]
+
+
+async def materialize_occurrence(db: AsyncSession, series: Task, occurrence: datetime.datetime) -> Task:
+    """
+    Row of one occurrence of a series, created on its first completion or edit.
+    When it was the series' next occurrence, next_occurrence moves past it.
+    """
+    occurrence = _as_utc(occurrence)
+    rule = parse_rule(series.recurrence_rule)
+    dtstart = _as_utc(series.due_date)
+    if next_occurrence(rule, dtstart, occurrence) != occurrence:
+        raise HTTPException(status_code=400, detail="Not an occurrence of this task")
+
+    result = await db.execute(select(Task).where(
+        Task.recurrence_parent_id == series.id,
+        Task.occurrence_date == occurrence,
+    ))
+    task = result.scalars().first()
+    if task:
+        return task
+
+    task = Task(
+        user_id=series.user_id,
+        title=series.title,
+        description=series.description,
+        priority=series.priority,
+        notification_id=series.notification_id,
+        due_date=occurrence,
+        completed=False,
+        recurrence_parent_id=series.id,
+        occurrence_date=occurrence,
+    )
+    db.add(task)
+    await db.flush()
+
+    if series.next_occurrence is not None and _as_utc(series.next_occurrence) == occurrence:
+        materialized = await materialized_occurrences(db, [series.id], since=occurrence)
+        series.next_occurrence = next_occurrence(rule, dtstart, occurrence, skip=frozenset(materialized.get(series.id, ())))
+        if series.next_occurrence is None:
+            series.completed = True
+            series.completed_at = datetime.datetime.now(datetime.UTC)
+
     return task
@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import cache
+from core.config import settings
+from db.database import SessionLocal
+from models.tokens import TokenRevocation
+
+logger = logging.getLogger(__name__)
+
+# Re-read rows revoked this long before the last sync, covers transactions
+# that committed after a sync although their revoked_at is older
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+PURGE_INTERVAL = datetime.timedelta(hours=1)
+USED_TOKEN_NAMESPACE = "used_refresh_tokens"
+
+
+def token_family(payload: dict) -> Optional[str]:
+    """Family of a token, tokens issued before families existed are a family of their own."""
+    return payload.get("fam") or payload.get("jti")
+
+
+class RevocationList:
+    """
+    Revoked refresh token families, held in memory by every worker so that
+    refreshes and authenticated requests are checked with a set lookup.
+    Filled from token_revocations on start and then synced incrementally,
+    a revocation reaches the other workers within sync_interval seconds.
+    """
+
+    def __init__(self, sync_interval: int):
+        self.sync_interval = sync_interval
+        # Family id -> expiry, entries are dropped once the family has expired
+        self._families: Dict[str, datetime.datetime] = {}
+        self._synced_at: Optional[datetime.datetime] = None
+        self._purged_at: Optional[datetime.datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, family_id: Optional[str]) -> bool:
+        return family_id in self._families
+
+    def add(self, family_id: str, expires_at: datetime.datetime) -> None:
+        self._families[family_id] = expires_at
+
+    async def sync(self) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        query = select(TokenRevocation.family_id, TokenRevocation.expires_at).where(TokenRevocation.expires_at > now)
+        if self._synced_at is not None:
+            query = query.where(TokenRevocation.revoked_at > self._synced_at - SYNC_OVERLAP)
+
+        async with SessionLocal() as db:
+            rows = (await db.execute(query)).all()
+            if self._purged_at is None or now - self._purged_at > PURGE_INTERVAL:
+                await db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at < now))
+                await db.commit()
+                self._purged_at = now
+
+        for family_id, expires_at in rows:
+            self.add(family_id, expires_at)
+        self._families = {family_id: expires_at for family_id, expires_at in self._families.items() if expires_at > now}
+        self._synced_at = now
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Failed to sync revoked token families, retrying later: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_list = RevocationList(sync_interval=settings.TOKEN_REVOCATION_SYNC_SECONDS)
+
+
+def _family_expiry() -> datetime.datetime:
+    # A family lives as long as its newest refresh token can
+    return datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+async def revoke_family(db: AsyncSession, family_id: str, user_id: int) -> None:
+    expires_at = _family_expiry()
+    await db.execute(
+        insert(TokenRevocation)
+        .values(family_id=family_id, user_id=user_id, expires_at=expires_at)
+        .on_conflict_do_nothing()
+    )
+    await db.commit()
+    revocation_list.add(family_id, expires_at)
+
+
+def require_shared_cache() -> None:
+    """
+    Refresh token reuse is detected with marks in the cache, which every
+    worker must see until the token expires. With CACHE_BACKEND=local each
+    worker has its own marks and evicts them with its LRU, so a replayed
+    token is accepted by another worker or after eviction: refused in
+    production, a warning elsewhere. Called on startup.
+    """
+    if cache.backend == "redis":
+        return
+    message = "Refresh token reuse is only detected within one worker with CACHE_BACKEND=local"
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError(f"{message}, production needs CACHE_BACKEND=redis")
+    logger.warning(f"{message}, use CACHE_BACKEND=redis when running more than one worker")
+
+
+async def use_refresh_token(payload: dict) -> Optional[datetime.datetime]:
+    """
+    Mark a refresh token as used with an atomic set-if-absent in the shared
+    cache, no database write per refresh. Returns None on its first use, or
+    when it was used before, the time of that first use. See
+    require_shared_cache for why this needs CACHE_BACKEND=redis; Redis must
+    also not evict the marks, i.e. have room for one per refresh within
+    REFRESH_TOKEN_EXPIRE_DAYS. An unavailable cache lets the refresh through.
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    ttl = max(int(payload["exp"] - now.timestamp()), 1)
+    try:
+        used_at = await cache.add(USED_TOKEN_NAMESPACE, payload["jti"], now.timestamp(), ttl=ttl)
+    except Exception as e:
+        logger.warning(f"Cache unavailable, refresh token reuse not checked: {e}")
+        return None
+    return None if used_at is None else datetime.datetime.fromtimestamp(used_at, tz=datetime.UTC)
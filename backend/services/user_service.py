@@ -3,26 +3,33 @@ from datetime import datetime, timezone
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import EmailStr
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.functions import func
+from sqlalchemy.orm.attributes import set_committed_value
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from db.database import get_db
+from core.cache import cache
+from core.config import settings
+from db import queries
+from db.database import get_db, get_read_db
 from models.users import User
 from core.security import get_password_hash, verify_password, validate_token
 from schemas.users import UserUpdate, UserChangePassword
+from services.last_login_buffer import last_login_buffer
 
 bearer_scheme = HTTPBearer()
 
 
-async def get_current_user(
-        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-        db: AsyncSession = Depends(get_db)
-) -> User:
-    token = credentials.credentials
-    payload = await validate_token(token, expected_type="access")
+USER_CACHE_NAMESPACE = "users"
+# Columns of the cached principal. The password hash stays out of the shared
+# cache, and so does the base64 picture, see load_user_picture
+CACHED_USER_COLUMNS = [
+    column.key for column in User.__table__.columns if column.key not in ("hashed_password", "picture")
+]
+
+
+async def _token_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    payload = await validate_token(credentials.credentials, expected_type="access")
 
     user_id = payload.get("sub")
     if not user_id:
@@ -31,11 +38,10 @@ async def get_current_user(
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"}
         )
+    return int(user_id)
 
-    query = select(User).where(User.id == int(user_id))
-    result = await db.execute(query)
-    user = result.scalars().first()
 
+def _ensure_active_user(user: User | None) -> User:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -52,9 +58,60 @@ async def get_current_user(
     return user
 
 
+async def _resolve_current_user(credentials: HTTPAuthorizationCredentials, db: AsyncSession) -> User:
+    user_id = await _token_user_id(credentials)
+    result = await db.execute(queries.user_by_id(user_id))
+    return _ensure_active_user(result.scalars().first())
+
+
+async def get_current_user(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+        db: AsyncSession = Depends(get_db)
+) -> User:
+    user = await _resolve_current_user(credentials, db)
+    # Commits on this session count as the user's writes for replica stickiness
+    db.info["user_id"] = user.id
+    return user
+
+
+async def get_current_user_read(
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+        db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """
+    Same as get_current_user for read-only endpoints: the user comes from the
+    principal cache, or from the read replica on a miss. It's a detached copy,
+    changes to it are not saved.
+    """
+    user_id = await _token_user_id(credentials)
+    return _ensure_active_user(await get_cached_user(db, user_id))
+
+
+async def get_cached_user(db: AsyncSession, user_id: int) -> User | None:
+    """Detached, read-only copy of the user from the principal cache, loaded through db on a miss."""
+
+    async def load_user():
+        result = await db.execute(queries.user_by_id(user_id))
+        user = result.scalars().first()
+        return None if user is None else {key: getattr(user, key) for key in CACHED_USER_COLUMNS}
+
+    data = await cache.get_or_set(USER_CACHE_NAMESPACE, user_id, load_user, ttl=settings.USER_CACHE_TTL_SECONDS)
+    return None if data is None else User(**data)
+
+
+async def load_user_picture(db: AsyncSession, user: User) -> User:
+    """Fills in the picture of a cached user, for the responses that include it."""
+    user.picture = (await db.execute(queries.user_picture(user.id))).scalar()
+    return user
+
+
+async def invalidate_cached_user(user_id: int) -> None:
+    """Call after changing or deleting a user, other changes show up within USER_CACHE_TTL_SECONDS."""
+    await cache.delete(USER_CACHE_NAMESPACE, user_id)
+
+
 async def get_user_by_email(db: AsyncSession, email: EmailStr) -> User | None:
-    query = select(User).where(User.email == email)
-    result = await db.execute(query)
+    result = await db.execute(queries.user_by_email(email))
     user = result.scalars().first()
     return user
 
@@ -85,8 +142,7 @@ async def authenticate_user(db: AsyncSession, email: EmailStr, password: str) ->
 
 
 async def get_user_by_google_id(db: AsyncSession, google_id: str) -> User | None:
-    query = select(User).where(User.google_id == google_id)
-    result = await db.execute(query)
+    result = await db.execute(queries.user_by_google_id(google_id))
     return result.scalars().first()
 
 
@@ -125,10 +181,15 @@ async def create_oauth_user(db: AsyncSession, email: str, google_id: str,
 
 
 async def update_last_login(db: AsyncSession, user: User):
-    """Explicitly update last login timestamp"""
-    user.last_login = func.now()
-    await db.commit()
-    await db.refresh(user)
+    """
+    Update last login timestamp. The in-memory user reflects it right away,
+    the database write is buffered and flushed in bulk by last_login_buffer.
+    """
+    now = datetime.now(timezone.utc)
+    # Not marked dirty, so a later commit on this session doesn't write it again
+    set_committed_value(user, "last_login", now)
+    last_login_buffer.record(user.id, now)
+    await invalidate_cached_user(user.id)
     return user
 
 
@@ -142,6 +203,7 @@ async def update_user_full_name(db: AsyncSession, user_id: int, user_update: Use
 
     db.add(db_user)
     await db.commit()
+    await invalidate_cached_user(user_id)
     await db.refresh(db_user)
     return db_user
 
@@ -0,0 +1,33 @@
+"""
+Tests, run from backend/ with `python -m unittest` (or pytest). Settings the
+app requires are given placeholder values here unless set in the environment,
+nothing connects to them unless a test says so.
+"""
+import os
+
+for name, value in {
+    "ENVIRONMENT": "local",
+    "API_PREFIX": "/api",
+    "DEBUG": "false",
+    "POSTGRES_USER": "tasks",
+    "POSTGRES_PASSWORD": "tasks",
+    "POSTGRES_DB": "tasks",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "ALLOWED_ORIGINS": "http://localhost",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "15",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "GOOGLE_REDIRECT_URI": "http://localhost/callback",
+    "GOOGLE_AUTH_URL": "http://localhost/auth",
+    "FRONTEND_REDIRECT_SCHEME": "tasks",
+    "STATE_SECRET_KEY": "test-state-secret",
+    "ADMIN_USERNAME": "admin",
+    "ADMIN_PASSWORD": "admin",
+    "ADMIN_SECRET_KEY": "test-admin-secret",
+    "NGINX_APP_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
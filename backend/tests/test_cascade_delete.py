@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, delete, event, func, select
+from sqlalchemy.orm import Session
+
+from db.database import Base
+from models.tasks import ArchivedTask, Task, TaskPriority
+from models.tokens import TokenRevocation  # noqa: F401  registers the table for create_all
+from models.users import User
+
+
+class CascadeMetadataTest(unittest.TestCase):
+    """Deleting a user leaves the tasks to the database, so the FK has to cascade."""
+
+    def test_task_user_fk_cascades(self):
+        for table in (Task.__table__, ArchivedTask.__table__):
+            (fk,) = table.c.user_id.foreign_keys
+            self.assertEqual(fk.target_fullname, "users.id", table.name)
+            self.assertEqual(fk.ondelete, "CASCADE", table.name)
+
+    def test_user_tasks_relationship_defers_to_the_database(self):
+        self.assertTrue(User.tasks.property.passive_deletes)
+
+
+class CascadeDeleteTest(unittest.TestCase):
+    """Against SQLite with foreign keys enforced, as Postgres always does."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        event.listen(self.engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+        Base.metadata.create_all(self.engine)
+        self.addCleanup(self.engine.dispose)
+
+        due = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        with Session(self.engine) as session:
+            self.user = User(email="owner@example.com")
+            other = User(email="other@example.com")
+            session.add_all([self.user, other])
+            session.flush()
+            for owner in (self.user, self.user, other):
+                session.add(Task(user_id=owner.id, title="task", due_date=due, priority=TaskPriority.low))
+            session.add(ArchivedTask(id=100, user_id=self.user.id, title="done", due_date=due, priority=TaskPriority.low))
+            session.commit()
+            self.user_id, self.other_id = self.user.id, other.id
+
+    def count(self, session, model, user_id):
+        return session.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+
+    def assert_only_other_user_left(self, session):
+        self.assertEqual(self.count(session, Task, self.user_id), 0)
+        self.assertEqual(self.count(session, ArchivedTask, self.user_id), 0)
+        self.assertEqual(self.count(session, Task, self.other_id), 1)
+
+    def test_bulk_delete_cascades(self):
+        # What the admin endpoint issues
+        with Session(self.engine) as session:
+            session.execute(delete(User).where(User.id == self.user_id))
+            session.commit()
+
+            self.assert_only_other_user_left(session)
+
+    def test_orm_delete_cascades_without_loading_tasks(self):
+        with Session(self.engine) as session:
+            user = session.get(User, self.user_id)
+            session.delete(user)
+            session.commit()
+
+            self.assertNotIn("tasks", user.__dict__)
+            self.assert_only_other_user_left(session)
+
+
+if __name__ == "__main__":
+    unittest.main()
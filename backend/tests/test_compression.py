@@ -0,0 +1,76 @@
+import unittest
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from core.compression import CompressionMiddleware
+from core.config import settings
+
+
+class FullStackCompressionTest(unittest.TestCase):
+    """Through main.app, where the BaseHTTPMiddleware turns every response into a stream."""
+
+    @classmethod
+    def setUpClass(cls):
+        from main import app
+
+        cls.client = TestClient(app)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(f"{settings.API_PREFIX}/health/live", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.headers["content-length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(response.json(), {"status": "ok"})
+
+
+class StreamThresholdTest(unittest.TestCase):
+    def client(self, chunks):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        app = Starlette(routes=[Route("/", lambda request: StreamingResponse(stream(), media_type="text/plain"))])
+        app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+        return TestClient(app)
+
+    def test_small_stream_is_sent_as_is(self):
+        response = self.client([b"a" * 10, b"b" * 10]).get("/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.headers["content-length"], "20")
+        self.assertEqual(response.content, b"a" * 10 + b"b" * 10)
+
+    def test_large_stream_is_compressed(self):
+        chunks = [bytes([65 + i]) * 40 for i in range(5)]
+        response = self.client(chunks).get("/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(response.content, b"".join(chunks))
+
+    def test_small_plain_response_is_sent_as_is(self):
+        app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("ok"))])
+        app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+        response = TestClient(app).get("/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.text, "ok")
+
+    def test_large_plain_response_is_compressed(self):
+        body = "x" * 500
+        app = Starlette(routes=[Route("/", lambda request: PlainTextResponse(body))])
+        app.add_middleware(CompressionMiddleware, encodings=["gzip"], minimum_size=100)
+        response = TestClient(app).get("/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.text, body)
+        self.assertLess(int(response.headers["content-length"]), len(body))
+
+
+if __name__ == "__main__":
+    unittest.main()
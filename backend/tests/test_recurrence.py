@@ -0,0 +1,66 @@
+import datetime
+import unittest
+
+from pydantic import ValidationError
+
+from schemas.tasks import TaskUpdate
+from services.recurrence import MAX_COUNT, last_occurrence, occurrences, parse_rule
+
+UTC = datetime.UTC
+FAR_FUTURE = datetime.datetime.max.replace(tzinfo=UTC)
+
+
+def iterated_last(rule, dtstart):
+    last = None
+    for last in occurrences(rule, dtstart, dtstart, FAR_FUTURE, limit=1 << 31):
+        pass
+    return last
+
+
+class LastOccurrenceTest(unittest.TestCase):
+    dtstart = datetime.datetime(2026, 1, 31, 9, 30, tzinfo=UTC)
+
+    def test_matches_iterating_the_series(self):
+        for rule in [
+            "FREQ=DAILY;COUNT=10",
+            "FREQ=DAILY;INTERVAL=3;UNTIL=20270315",
+            "FREQ=WEEKLY;COUNT=7",
+            "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH,SU;COUNT=11",
+            "FREQ=WEEKLY;BYDAY=TU,FR;UNTIL=20260630T120000Z",
+            "FREQ=MONTHLY;COUNT=12",
+            "FREQ=MONTHLY;INTERVAL=2;UNTIL=20300101",
+            "FREQ=YEARLY;UNTIL=20400131T000000Z",
+        ]:
+            with self.subTest(rule=rule):
+                parsed = parse_rule(rule)
+                self.assertEqual(last_occurrence(parsed, self.dtstart), iterated_last(parsed, self.dtstart))
+
+    def test_until_before_start(self):
+        self.assertIsNone(last_occurrence(parse_rule("FREQ=DAILY;UNTIL=20250101"), self.dtstart))
+
+    def test_series_ends_at_the_last_representable_date(self):
+        self.assertEqual(
+            last_occurrence(parse_rule("FREQ=DAILY;COUNT=5000000"), self.dtstart),
+            datetime.datetime(9999, 12, 31, 9, 30, tzinfo=UTC),
+        )
+        self.assertEqual(
+            last_occurrence(parse_rule("FREQ=YEARLY;COUNT=100000"), self.dtstart),
+            datetime.datetime(9999, 1, 31, 9, 30, tzinfo=UTC),
+        )
+        start = datetime.datetime(9999, 12, 30, tzinfo=UTC)
+        self.assertEqual(len(list(occurrences(parse_rule("FREQ=DAILY"), start, start, FAR_FUTURE))), 2)
+
+
+class RuleValidationTest(unittest.TestCase):
+    def task(self, rule):
+        return TaskUpdate(recurrence_rule=rule)
+
+    def test_count_and_until_are_capped(self):
+        self.task(f"FREQ=DAILY;COUNT={MAX_COUNT}")
+        for rule in [f"FREQ=DAILY;COUNT={MAX_COUNT + 1}", "FREQ=YEARLY;COUNT=100000", "FREQ=DAILY;UNTIL=99991231"]:
+            with self.subTest(rule=rule), self.assertRaises(ValidationError):
+                self.task(rule)
+
+
+if __name__ == "__main__":
+    unittest.main()